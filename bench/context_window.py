@@ -0,0 +1,80 @@
+"""Microbenchmark: the brain's recent-context window as the event count grows.
+
+Feeds events through Brain._track_context (as _emit does) and times, at each
+checkpoint, the per-event cost of appending and tracking and the per-cycle
+cost of selecting the context plus the last thought — against re-scanning the
+in-memory ring (events_buffer_size) and the full history for the same answer.
+
+    python bench/context_window.py [--events 1000000] [--calls 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from hermitclaw.brain import Brain  # noqa: E402
+from hermitclaw.config import config  # noqa: E402
+from hermitclaw.eventlog import SpillBuffer  # noqa: E402
+
+# A think cycle's worth of events, roughly as a crab emits them
+CYCLE = ("thought", "tool_call", "tool_result", "thought", "tool_call", "tool_result",
+         "reflection", "memory", "inbox")
+
+
+def scan(events, window: int):
+    """What _build_input and _build_continue_nudge did before the window was indexed."""
+    recent = [e for e in events if e["type"] in Brain._CONTEXT_TYPES][-window:]
+    last = next((e["text"] for e in reversed(events) if e["type"] == "thought"), None)
+    return recent, last
+
+
+def per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--calls", type=int, default=200, help="timed selections per checkpoint")
+    args = parser.parse_args()
+
+    window = config["max_thoughts_in_context"]
+    # Just the state _track_context touches; no box, log or model
+    brain = Brain.__new__(Brain)
+    brain.events = SpillBuffer(None, config["events_buffer_size"])
+    brain._context = deque(maxlen=window)
+    brain._last_thought = None
+    history = []
+
+    checkpoints = [n for n in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if n <= args.events]
+    print(f"window={window} ring={brain.events.maxlen} calls/checkpoint={args.calls}")
+    print(f"{'events':>10}  {'append+track':>13}  {'indexed':>9}  {'scan ring':>10}  {'scan full':>11}")
+    n = 0
+    for target in checkpoints:
+        start_n, started = n, time.perf_counter()
+        while n < target:
+            kind = CYCLE[n % len(CYCLE)]
+            entry = {"type": kind, "text": f"{kind} {n}", "thought_number": n // len(CYCLE)}
+            brain.events.append(entry)
+            brain._track_context(entry)
+            history.append(entry)
+            n += 1
+        track = (time.perf_counter() - started) / (target - start_n) * 1e6
+
+        indexed = per_call(lambda: (list(brain._context), brain._last_thought), args.calls)
+        assert (list(brain._context), brain._last_thought) == scan(history, window)
+        ring = per_call(lambda: scan(brain.events, window), args.calls)
+        full = per_call(lambda: scan(history, window), max(1, args.calls * 1_000 // target))
+        print(f"{target:>10,}  {track:>10.2f} us  {indexed:>6.2f} us  "
+              f"{ring:>7.1f} us  {full:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
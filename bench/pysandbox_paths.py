@@ -0,0 +1,65 @@
+"""Microbenchmark: the sandbox's per-call path check, by how deep the path is.
+
+Times pysandbox._check_path on files at increasing depth inside a box, against
+the full-resolution check it replaced (realpath, then a prefix check).
+
+    python bench/pysandbox_paths.py [--calls 20000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from hermitclaw.pysandbox import _check_path  # noqa: E402
+
+
+def realpath_check(path, env_root):
+    """The check before directories were resolved by the kernel."""
+    resolved = os.path.realpath(os.path.join(os.getcwd(), os.fsdecode(path)))
+    if resolved != env_root and not resolved.startswith(env_root + os.sep):
+        raise PermissionError(path)
+
+
+def per_call(check, path, root, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        check(path, root)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    tmp = os.path.realpath(tempfile.mkdtemp())
+    try:
+        root = os.path.join(tmp, "box")
+        os.makedirs(root)
+        os.chdir(root)
+        print(f"box={root} ({root.count(os.sep)} components) calls={args.calls}")
+        print(f"{'depth':>5}  {'_check_path':>11}  {'realpath':>9}  {'speedup':>7}")
+        for depth in (0, 2, 4, 8, 16):
+            directory = os.path.join(root, *[f"d{i}" for i in range(depth)])
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "f.txt")
+            open(path, "w").close()
+            new = per_call(_check_path, path, root, args.calls)
+            old = per_call(realpath_check, path, root, args.calls)
+            print(f"{depth:>5}  {new:>8.2f} us  {old:>6.2f} us  {old / new:>6.1f}x")
+        rel = os.path.join(*[f"d{i}" for i in range(8)], "f.txt")
+        new = per_call(_check_path, rel, root, args.calls)
+        old = per_call(realpath_check, rel, root, args.calls)
+        print(f"{'rel 8':>5}  {new:>8.2f} us  {old:>6.2f} us  {old / new:>6.1f}x")
+    finally:
+        os.chdir("/")
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
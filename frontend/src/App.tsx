@@ -103,6 +103,7 @@ export default function App() {
   const [crabState, setCrabState] = useState("idle");
   const [alert, setAlert] = useState(false);
   const [activity, setActivity] = useState({ type: "idle", detail: "" });
+  const [liveOutput, setLiveOutput] = useState("");
   const [chatInput, setChatInput] = useState("");
   const [conversing, setConversing] = useState(false);
   const [countdown, setCountdown] = useState(0);
@@ -135,7 +136,12 @@ export default function App() {
 
     ws.onmessage = (ev) => {
       const msg = JSON.parse(ev.data);
-      if (msg.event === "api_call") setCalls((prev) => [...prev, msg.data]);
+      if (msg.event === "api_call") {
+        setCalls((prev) => [...prev, msg.data]);
+        setLiveOutput("");
+      }
+      // Output of the command that's running right now (the last 2000 chars)
+      if (msg.event === "tool_output") setLiveOutput((prev) => (prev + msg.data.text).slice(-2000));
       if (msg.event === "position") setPosition(msg.data);
       if (msg.event === "status") {
         setCrabState(msg.data.state);
@@ -182,6 +188,7 @@ export default function App() {
       const statusData = await statusRes.json();
       const idData = await idRes.json();
       setCalls(rawData);
+      setLiveOutput("");
       if (statusData.position) setPosition(statusData.position);
       if (statusData.focus_mode !== undefined) setFocusMode(statusData.focus_mode);
       setCrabState(statusData.state || "idle");
@@ -491,6 +498,13 @@ export default function App() {
                 </div>
               );
             })}
+            {liveOutput && (
+              <div style={{ display: "flex", justifyContent: "flex-end", marginBottom: 6 }}>
+                <div style={liveOutputBubble}>
+                  <pre style={{ ...bubbleText, color: "#9ca3af" }}>{liveOutput}</pre>
+                </div>
+              </div>
+            )}
             <div ref={bottomRef} />
           </div>
           </div>
@@ -711,6 +725,13 @@ const bubbleRight: React.CSSProperties = {
   borderRadius: "16px 16px 4px 16px",
 };
 
+const liveOutputBubble: React.CSSProperties = {
+  ...bubbleBase,
+  background: "#111",
+  borderRadius: "16px 16px 4px 16px",
+  opacity: 0.85,
+};
+
 const dreamBubbleLeft: React.CSSProperties = {
   ...bubbleBase,
   background: "#7c3aed",
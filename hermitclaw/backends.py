@@ -0,0 +1,269 @@
+"""Ollama backend pool — routing, failover and health checks across inference boxes."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+logger = logging.getLogger("hermitclaw.backends")
+
+# Shared threads for hedged requests (the losing request finishes in the background)
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hermitclaw-hedge")
+
+
+class BackendUnavailable(Exception):
+    """Every backend failed for a request."""
+
+
+class Backend:
+    """One Ollama server and what we know about it."""
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding: int = 0
+        self.healthy: bool = True
+        self.down_until: float = 0.0
+        self.cooldown: float = 0.0
+        self.requests: int = 0
+        self.failures: int = 0
+        self.latency: dict[str, float] = {}  # path -> EWMA seconds
+        self.busy: float = 0.0  # seconds spent with at least one request in flight
+        self._busy_since: float | None = None
+
+    def record_latency(self, path: str, seconds: float):
+        prev = self.latency.get(path)
+        if prev is None:
+            self.latency[path] = seconds
+        else:
+            self.latency[path] = prev + Backend.EWMA_ALPHA * (seconds - prev)
+
+    def busy_time(self, now: float) -> float:
+        """Cumulative busy seconds, including the current stretch."""
+        if self._busy_since is None:
+            return self.busy
+        return self.busy + (now - self._busy_since)
+
+    def available(self, now: float) -> bool:
+        return self.healthy or now >= self.down_until
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": {p: round(s * 1000, 1) for p, s in self.latency.items()},
+        }
+
+
+class BackendPool:
+    """Routes requests across several Ollama servers.
+
+    Routing is least-outstanding-requests or latency-weighted. A request with a
+    sticky key (the crab's name) goes to the same backend while it is healthy and
+    not badly overloaded, so that backend keeps the crab's KV cache warm. Connection
+    errors, timeouts and 5xx responses mark a backend down and fail over to the next.
+    """
+
+    COOLDOWN_MIN = 2.0
+    COOLDOWN_MAX = 60.0
+
+    def __init__(self, urls: list[str], strategy: str = "least_outstanding",
+                 sticky: bool = True, sticky_slack: int = 2, hedge_ms: float = 0):
+        if not urls:
+            raise ValueError("BackendPool needs at least one URL")
+        self.backends = [Backend(u) for u in urls]
+        self.strategy = strategy
+        self.sticky = sticky
+        self.sticky_slack = sticky_slack
+        self.hedge_ms = hedge_ms
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "BackendPool":
+        urls = cfg.get("ollama_backends") or [cfg.get("ollama_base", "http://localhost:11434")]
+        return cls(
+            urls,
+            strategy=cfg.get("ollama_routing", "least_outstanding"),
+            sticky=cfg.get("ollama_sticky", True),
+            hedge_ms=cfg.get("ollama_hedge_ms", 0),
+        )
+
+    # --- Selection ---
+
+    def _score(self, b: Backend, path: str) -> tuple:
+        if self.strategy == "latency":
+            # Expected wait: everything queued ahead of us plus our own request
+            lat = b.latency.get(path)
+            if lat is None:
+                lat = min(b.latency.values(), default=0.0)
+            return ((b.outstanding + 1) * lat, b.outstanding)
+        return (b.outstanding, b.latency.get(path, 0.0))
+
+    @staticmethod
+    def _rendezvous(key: str, b: Backend) -> bytes:
+        return hashlib.sha1(f"{key}|{b.url}".encode()).digest()
+
+    def _order(self, path: str, key: str | None, exclude=()) -> list[Backend]:
+        """Backends in the order we should try them. Caller holds the lock."""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b not in exclude]
+        up = [b for b in candidates if b.available(now)]
+        down = sorted((b for b in candidates if not b.available(now)), key=lambda b: b.down_until)
+        up.sort(key=lambda b: self._score(b, path))
+
+        if self.sticky and key and len(up) > 1:
+            home = max(up, key=lambda b: self._rendezvous(key, b))
+            if home.outstanding <= up[0].outstanding + self.sticky_slack:
+                up.remove(home)
+                up.insert(0, home)
+
+        # Down backends are a last resort — better a slow retry than no answer
+        return up + down
+
+    def pick(self, path: str = "/api/chat", key: str | None = None) -> Backend:
+        with self._lock:
+            return self._order(path, key)[0]
+
+    # --- Bookkeeping ---
+
+    def _begin(self, b: Backend):
+        with self._lock:
+            if b.outstanding == 0:
+                b._busy_since = time.monotonic()
+            b.outstanding += 1
+            b.requests += 1
+
+    def _end(self, b: Backend, path: str, started: float, ok: bool):
+        with self._lock:
+            b.outstanding -= 1
+            if b.outstanding == 0 and b._busy_since is not None:
+                b.busy += time.monotonic() - b._busy_since
+                b._busy_since = None
+            if ok:
+                b.record_latency(path, time.monotonic() - started)
+                if not b.healthy:
+                    logger.info(f"Backend {b.url} is back")
+                b.healthy = True
+                b.cooldown = 0.0
+            else:
+                self._mark_down(b)
+
+    def _mark_down(self, b: Backend):
+        """Caller holds the lock."""
+        b.failures += 1
+        b.cooldown = min(max(b.cooldown * 2, BackendPool.COOLDOWN_MIN), BackendPool.COOLDOWN_MAX)
+        b.down_until = time.monotonic() + b.cooldown
+        if b.healthy:
+            logger.warning(f"Backend {b.url} marked down for {b.cooldown:.0f}s")
+        b.healthy = False
+
+    # --- Requests ---
+
+    def _post_one(self, b: Backend, path: str, payload: dict, timeout: float) -> requests.Response:
+        """POST to a single backend. Raises on connection errors, timeouts and 5xx."""
+        self._begin(b)
+        started = time.monotonic()
+        try:
+            resp = requests.post(f"{b.url}{path}", json=payload, timeout=timeout)
+        except Exception:
+            self._end(b, path, started, ok=False)
+            raise
+        # A 4xx is the request's fault, not the backend's
+        ok = resp.status_code < 500
+        self._end(b, path, started, ok)
+        if not ok:
+            resp.raise_for_status()
+        return resp
+
+    def post(self, path: str, payload: dict, timeout: float = 300,
+             key: str | None = None, exclude=()) -> requests.Response:
+        """POST with failover. Returns the first non-5xx response."""
+        with self._lock:
+            order = self._order(path, key, exclude)
+        last_err: Exception | None = None
+        for b in order:
+            try:
+                resp = self._post_one(b, path, payload, timeout)
+            except requests.RequestException as e:
+                logger.warning(f"{path} on {b.url} failed: {e}")
+                last_err = e
+                continue
+            resp.raise_for_status()
+            return resp
+        raise BackendUnavailable(f"all backends failed for {path}: {last_err}")
+
+    def post_hedged(self, path: str, payload: dict, timeout: float = 30,
+                    key: str | None = None) -> requests.Response:
+        """POST to the best backend; if it hasn't answered after hedge_ms, race a second one."""
+        with self._lock:
+            order = self._order(path, key)
+        if not self.hedge_ms or len(order) < 2 or not order[1].available(time.monotonic()):
+            return self.post(path, payload, timeout, key)
+
+        primary, secondary = order[0], order[1]
+        first = _hedge_executor.submit(self._post_one, primary, path, payload, timeout)
+        done, _ = wait([first], timeout=self.hedge_ms / 1000.0)
+        if done and first.exception() is None:
+            resp = first.result()
+            resp.raise_for_status()
+            return resp
+
+        pending = {first} if not done else set()
+        pending.add(_hedge_executor.submit(self._post_one, secondary, path, payload, timeout))
+        last_err = first.exception() if done else None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    resp = fut.result()
+                    resp.raise_for_status()
+                    return resp
+                last_err = fut.exception()
+        # Both hedges failed — fall back to plain failover over the rest
+        if len(order) > 2:
+            return self.post(path, payload, timeout, key, exclude=(primary, secondary))
+        raise BackendUnavailable(f"all backends failed for {path}: {last_err}")
+
+    # --- Health ---
+
+    def check_health(self, timeout: float = 2.0):
+        """Probe every backend's /api/tags and update its health."""
+        for b in self.backends:
+            try:
+                requests.get(f"{b.url}/api/tags", timeout=timeout).raise_for_status()
+                healthy = True
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy and not b.healthy:
+                    logger.info(f"Backend {b.url} passed health check")
+                    b.healthy = True
+                    b.cooldown = 0.0
+                elif not healthy:
+                    self._mark_down(b)
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [b.status() for b in self.backends]
+
+    def load(self) -> list[dict]:
+        """A consistent snapshot of busy time, queue depth and chat latency per backend."""
+        with self._lock:
+            now = time.monotonic()
+            return [{
+                "url": b.url,
+                "up": b.available(now),
+                "busy": b.busy_time(now),
+                "outstanding": b.outstanding,
+                "chat_latency": b.latency.get("/api/chat"),
+            } for b in self.backends]
+
@@ -3,22 +3,41 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+import hashlib
 import json
 import logging
 import os
 import random
+import threading
+import time
+from collections import deque
 from datetime import datetime, date
 
 from hermitclaw.config import config
+from hermitclaw.conversation import Conversation
+from hermitclaw.calllog import CallLog
+from hermitclaw.chunkindex import ChunkIndex, chunks_for
+from hermitclaw.eventlog import IndexedLog, SpillBuffer
+from hermitclaw.fanout import Fanout
+from hermitclaw.fileindex import index_for
+from hermitclaw.ingest import ingest_file
 from hermitclaw.memory import MemoryStream
+from hermitclaw.pacing import pacer
 from hermitclaw.prompts import main_system_prompt, REFLECTION_PROMPT, PLANNING_PROMPT, FOCUS_NUDGE
-from hermitclaw.providers import chat, chat_short
-from hermitclaw.tools import execute_tool, ensure_venv
+from hermitclaw.providers import chat, chat_short, embed, usage
+from hermitclaw.stats import LatencyStats
+from hermitclaw.tools import execute_tool, ensure_venv, is_read_only, tool_executor
 
 logger = logging.getLogger("hermitclaw.brain")
 
-LOG_PATH = os.path.join(os.path.dirname(__file__), "..", "hermitclaw.log.jsonl")
+# How long _build_input takes, and how often the idle-time prefetch was usable
+context_stats = LatencyStats()
+prefetch_counts = {"hits": 0, "misses": 0, "invalidated": 0}
+
+WAKE_QUERY = "what was I working on and thinking about"
+
+# Per-box folder for the brain's own bookkeeping (hidden, so it's never indexed)
+STATE_DIR = ".hermitclaw"
 
 
 def _serialize_input(input_list: list) -> list:
@@ -32,6 +51,20 @@ def _serialize_output(output) -> list:
     return [item for item in output if isinstance(item, dict)]
 
 
+def _call_log_dir(base: str, env_path: str, name: str) -> str:
+    """The crab's API log folder, keyed on its box so two crabs with one name don't share it."""
+    real = os.path.realpath(env_path)
+    key = f"{os.path.basename(real)}-{hashlib.sha256(real.encode()).hexdigest()[:8]}"
+    path = os.path.join(base, key)
+    legacy = os.path.join(base, name.lower())  # before logs were keyed on the box
+    if not os.path.exists(path) and os.path.isdir(legacy):
+        try:
+            os.rename(legacy, path)
+        except OSError as e:
+            logger.warning(f"Couldn't move {legacy} to {path}: {e}")
+    return path
+
+
 class Brain:
     # Room is 12x12 tiles (extracted from Smallville-style tilemap)
     ROOM_LOCATIONS = {
@@ -71,11 +104,6 @@ class Brain:
                     b.add((x, y))
         return b
 
-    # File extensions we can read as text
-    _TEXT_EXTS = {".txt", ".md", ".py", ".json", ".csv", ".yaml", ".yml",
-                  ".toml", ".js", ".ts", ".html", ".css", ".sh", ".log"}
-    _PDF_EXTS = {".pdf"}
-    _IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
     # Internal files the crab/system manages — never trigger alerts
     _IGNORE_FILES = {"memory_stream.jsonl", "identity.json"}
     # Internal files that live in the root but shouldn't trigger inbox alerts
@@ -84,16 +112,43 @@ class Brain:
     # Planning frequency — plan every N think cycles
     PLAN_INTERVAL = 10
 
+    # How long a cycle waits for dropped files to be read before going ahead without them
+    INGEST_WAIT = 0.25
+    OUTPUT_FLUSH = 0.1  # seconds between live command-output messages
+
+    # Event types replayed to the model as recent context
+    _CONTEXT_TYPES = ("thought", "tool_call", "reflection")
+
     def __init__(self, identity: dict, env_path: str):
         self.identity = identity
         self.env_path = env_path
-        self.events: list[dict] = []
-        self.api_calls: list[dict] = []
+        # Every event is appended to the box's .hermitclaw/ log; the newest stay in memory
+        # (and are reloaded from the log on restart)
+        self._state_dir = os.path.join(env_path, STATE_DIR)
+        self.events = SpillBuffer(IndexedLog(os.path.join(self._state_dir, "events.jsonl")),
+                                  config["events_buffer_size"], write_through=True)
+        # Every API call is written through to the crab's rotated log (outside the box)
+        log_cfg = config["api_log"]
+        self.call_log = CallLog(
+            _call_log_dir(log_cfg["dir"], env_path, identity["name"]),
+            max_bytes=int(log_cfg["max_segment_mb"] * (1 << 20)),
+            max_age=log_cfg["max_segment_age_hours"] * 3600,
+            compress=log_cfg["compress"],
+        )
+        self.api_calls = SpillBuffer(self.call_log, config["api_calls_buffer_size"],
+                                     write_through=True)
+        # What _build_input needs, kept up to date in _emit instead of re-scanning events
+        self._context: deque[dict] = deque(maxlen=config["max_thoughts_in_context"])
+        self._last_thought: str | None = None
+        self._index_context()
         self.thought_count: int = 0
+        self.last_active: float | None = None  # wall time of the last thought
+        self._waking: bool = True  # next cycle gets the wake-up nudge
         self.state: str = "idle"
         self.running: bool = False
-        self._ws_clients: set = set()
+        self.viewers = Fanout(config["ws_queue_size"])
         self.stream: MemoryStream | None = None  # loaded in run()
+        self.chunks: ChunkIndex | None = None  # searchable file chunks, loaded in run()
         self.position = {"x": 5, "y": 5}
         self.latest_snapshot = None  # data URL from frontend canvas
         if not Brain._BLOCKED:
@@ -102,19 +157,31 @@ class Brain:
         # File tracking — populated in run()
         self._seen_env_files: set[str] = set()
         self._inbox_pending: list[dict] = []
+        self._ingesting: dict[str, asyncio.Future] = {}  # dropped files being read
 
         # Planning state
         self._cycles_since_plan: int = 0
         self._current_focus: str = ""
 
+        # Reflection and planning run in the background; results are merged at cycle boundaries
+        self._reflect_task: asyncio.Task | None = None
+        self._plan_task: asyncio.Task | None = None
+        # File-chunk embedding also runs in the background; nothing waits for it
+        self._index_task: asyncio.Task | None = None
+
         # Focus mode
         self._focus_mode: bool = False
 
         # Conversation state
-        self._user_message: str | None = None
-        self._conversation_event: asyncio.Event = asyncio.Event()
-        self._conversation_reply: str | None = None
-        self._waiting_for_reply: bool = False
+        self.conversation = Conversation(reply_window=config["reply_window_seconds"])
+        self._conversation_timer: asyncio.TimerHandle | None = None
+        self._last_contact: float = 0.0  # wall time the user last spoke to the crab
+        self._wake: asyncio.Event = asyncio.Event()  # cuts the idle pause short
+
+        # Next cycle's slow context, gathered while idle (see _prefetch)
+        self._prefetched: dict | None = None
+        self._prefetch_epoch: int = 0
+        self._prefetch_task: asyncio.Task | None = None  # in flight, and not yet invalidated
 
     # --- Helpers ---
 
@@ -149,33 +216,31 @@ class Brain:
 
     def _list_env_files(self) -> list[str]:
         """List all files in environment/ (relative paths)."""
-        env_root = self.env_path
-        files = []
-        for dirpath, dirnames, filenames in os.walk(env_root):
-            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
-            for fname in filenames:
-                if fname.startswith(".") or fname in Brain._IGNORE_FILES:
-                    continue
-                rel = os.path.relpath(os.path.join(dirpath, fname), env_root)
-                files.append(rel)
-        return sorted(files)
+        return sorted(self._scan_env_files())
+
+    def _index_context(self):
+        """(Re)build the recent-context window from the in-memory events."""
+        self._context = deque(maxlen=config["max_thoughts_in_context"])
+        for ev in self.events:
+            self._track_context(ev)
+
+    def _track_context(self, entry: dict):
+        if entry["type"] in Brain._CONTEXT_TYPES:
+            self._context.append(entry)
+            if entry["type"] == "thought":
+                self._last_thought = entry["text"]
 
     # --- WebSocket / events ---
 
     def add_ws_client(self, ws):
-        self._ws_clients.add(ws)
+        self.viewers.add(ws)
 
     def remove_ws_client(self, ws):
-        self._ws_clients.discard(ws)
+        self.viewers.remove(ws)
 
     async def _broadcast(self, message: dict):
-        dead = set()
-        for ws in self._ws_clients:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                dead.add(ws)
-        self._ws_clients -= dead
+        # Queued per viewer; a slow browser tab never holds up the crab
+        self.viewers.broadcast(message)
 
     async def _emit(self, event_type: str, **data):
         entry = {
@@ -185,6 +250,7 @@ class Brain:
             **data,
         }
         self.events.append(entry)
+        self._track_context(entry)
         await self._broadcast({"event": "entry", "data": entry})
         text = data.get("text", data.get("command", data.get("content", "")))
         logger.info(f"[{event_type}] {str(text)[:120]}")
@@ -199,17 +265,12 @@ class Brain:
             "output": _serialize_output(response["output"]),
             "is_dream": is_reflection,  # keep key name for frontend compatibility
             "is_planning": is_planning,
+            "usage": response.get("usage"),
         }
+        # Written through to the call log by its background writer — no disk I/O here
         self.api_calls.append(entry)
         await self._broadcast({"event": "api_call", "data": entry})
 
-        # Append to log file (project root, outside environment)
-        try:
-            with open(LOG_PATH, "a") as f:
-                f.write(json.dumps(entry) + "\n")
-        except Exception:
-            pass
-
     # --- Movement ---
 
     def _is_blocked(self, x: int, y: int) -> bool:
@@ -237,43 +298,57 @@ class Brain:
     # --- Conversation ---
 
     async def _handle_respond(self, args: dict) -> str:
-        """Handle the respond tool — send message to user, wait for reply."""
+        """Handle the respond tool — say it and carry on. A reply lands in the
+        conversation inbox and is heard on a later thought."""
         msg = args.get("message", "")
-        self._waiting_for_reply = True
-        self._conversation_event.clear()
-        self._conversation_reply = None
+        self._last_contact = time.time()
+        self.conversation.said(msg)
 
+        window = self.conversation.reply_window
         await self._broadcast({
             "event": "conversation",
-            "data": {"state": "waiting", "message": msg, "timeout": 45},
+            "data": {"state": "waiting", "message": msg, "timeout": window},
         })
+        if self._conversation_timer:
+            self._conversation_timer.cancel()
+        self._conversation_timer = asyncio.get_running_loop().call_later(window, self._end_conversation)
 
-        try:
-            await asyncio.wait_for(self._conversation_event.wait(), timeout=45)
-            text = self._conversation_reply or ""
-            reply = f'They say: "{text}"\n(Use respond again to reply, or go back to what you were doing.)'
-        except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
-            reply = "(No reply came. You can get back to what you were doing.)"
+        return ("(You said it. If they answer, you'll hear it on a coming thought — "
+                "carry on with what you were doing meanwhile.)")
 
-        self._waiting_for_reply = False
-        self._conversation_event.clear()
-        self._conversation_reply = None
-
-        await self._broadcast({
-            "event": "conversation",
-            "data": {"state": "ended"},
-        })
-
-        return reply
+    def _end_conversation(self):
+        """The reply window closed, or the reply came in."""
+        if self._conversation_timer:
+            self._conversation_timer.cancel()
+            self._conversation_timer = None
+        self.viewers.broadcast({"event": "conversation", "data": {"state": "ended"}})
 
     def receive_user_message(self, text: str):
-        """Queue a message from the user to be injected in the next think cycle."""
-        self._user_message = text
+        """Queue a message from the user for the next think cycle (a reply, if the crab just spoke)."""
+        msg = self.conversation.receive(text)
+        self._last_contact = time.time()
+        if msg["reply"]:
+            self._end_conversation()
+        self._invalidate_prefetch()
+        self._wake.set()
+
+    # Replies and fresh messages share the inbox now
+    receive_conversation_reply = receive_user_message
 
-    def receive_conversation_reply(self, text: str):
-        """Deliver a reply while the crab is waiting (inside a respond tool call)."""
-        self._conversation_reply = text
-        self._conversation_event.set()
+    @staticmethod
+    def _voice_nudge(messages: list[dict]) -> str:
+        """Frame queued messages from the owner, oldest first."""
+        lines = []
+        for m in messages:
+            if m["reply"]:
+                lines.append(f'They say: "{m["text"]}"')
+            else:
+                lines.append(f'You hear a voice from outside your room say: "{m["text"]}"')
+        if any(m["reply"] for m in messages):
+            lines.append("(Use respond again to reply, or go back to what you were doing.)")
+        else:
+            lines.append("\nYou can respond with the respond tool, or just keep doing what you're doing.")
+        return "\n".join(lines)
 
     async def set_focus_mode(self, enabled: bool):
         """Toggle focus mode on or off."""
@@ -284,61 +359,39 @@ class Brain:
 
     def _scan_env_files(self) -> set[str]:
         """Get all file paths in environment/ (relative), excluding internal files."""
-        env_root = self.env_path
-        files = set()
-        for dirpath, dirnames, filenames in os.walk(env_root):
-            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
-            for fname in filenames:
-                if fname.startswith(".") or fname in Brain._IGNORE_FILES:
-                    continue
-                rel = os.path.relpath(os.path.join(dirpath, fname), env_root)
-                files.add(rel)
-        return files
-
-    def _check_new_files(self) -> list[dict]:
-        """Scan environment/ for new files. Returns info for each new one."""
+        return {
+            f for f in index_for(self.env_path).files()
+            if os.path.basename(f) not in Brain._IGNORE_FILES
+        }
+
+    def _find_new_files(self) -> list[str]:
+        """New files in environment/ since the last check (relative paths); marks them seen."""
         current = self._scan_env_files()
         new_paths = current - self._seen_env_files
         self._seen_env_files = current
-        env_root = self.env_path
-        results = []
-        for rel_path in sorted(new_paths):
-            fpath = os.path.join(env_root, rel_path)
-            if not os.path.isfile(fpath):
+        return sorted(p for p in new_paths if os.path.isfile(os.path.join(self.env_path, p)))
+
+    def _start_ingest(self, rel_path: str):
+        """Read a dropped file in a worker thread (see ingest.py)."""
+        task = asyncio.ensure_future(
+            asyncio.to_thread(ingest_file, os.path.join(self.env_path, rel_path), rel_path)
+        )
+        task.add_done_callback(lambda _: self._wake.set())
+        self._ingesting[rel_path] = task
+
+    def _collect_ingested(self) -> list[dict]:
+        """Inbox entries for every dropped file that has finished ingesting."""
+        ready = []
+        for rel_path, task in list(self._ingesting.items()):
+            if not task.done():
                 continue
-            ext = os.path.splitext(rel_path)[1].lower()
-            entry: dict = {"name": rel_path, "content": "", "image": None}
-            if ext in Brain._PDF_EXTS:
-                try:
-                    import pymupdf
-                    doc = pymupdf.open(fpath)
-                    pages = []
-                    for page in doc:
-                        pages.append(page.get_text())
-                    doc.close()
-                    text = "\n\n".join(pages)
-                    entry["content"] = text[:4000] if text.strip() else "(PDF has no extractable text)"
-                except ImportError:
-                    entry["content"] = "(install pymupdf to read PDFs: pip install pymupdf)"
-                except Exception:
-                    entry["content"] = "(could not read PDF)"
-            elif ext in Brain._TEXT_EXTS:
-                try:
-                    text = open(fpath, "r", errors="replace").read()
-                    entry["content"] = text[:2000]
-                except Exception:
-                    entry["content"] = "(could not read file)"
-            elif ext in Brain._IMAGE_EXTS:
-                try:
-                    data = open(fpath, "rb").read()
-                    mime = "image/png" if ext == ".png" else "image/jpeg" if ext in (".jpg", ".jpeg") else "image/gif" if ext == ".gif" else "image/webp"
-                    entry["image"] = f"data:{mime};base64,{base64.b64encode(data).decode()}"
-                except Exception:
-                    entry["content"] = "(could not read image)"
-            else:
-                entry["content"] = f"(binary file: {rel_path})"
-            results.append(entry)
-        return results
+            del self._ingesting[rel_path]
+            try:
+                ready.append(task.result())
+            except Exception as e:
+                logger.error(f"Failed to ingest {rel_path}: {e}")
+                ready.append({"name": rel_path, "content": "(could not read file)", "image": None})
+        return ready
 
     # --- Activity classification ---
 
@@ -353,6 +406,9 @@ class Brain:
         if tool_name == "web_search":
             query = tool_args.get("query", "")
             return {"type": "researching", "detail": f"Searching: {query[:50]}"}
+        if tool_name == "search_files":
+            query = tool_args.get("query", "")
+            return {"type": "reading", "detail": f"Looking through notes: {query[:40]}"}
         if tool_name == "shell":
             cmd = tool_args.get("command", "").strip()
             # Python script or one-liner
@@ -374,14 +430,21 @@ class Brain:
 
     # --- Input building ---
 
-    def _build_input(self) -> tuple[str, list[dict]]:
+    async def _build_input(self) -> tuple[str, list[dict]]:
+        started = time.monotonic()
+        try:
+            return self._assemble_input(await self._take_prefetched())
+        finally:
+            context_stats.record(time.monotonic() - started)
+
+    def _assemble_input(self, ctx: dict) -> tuple[str, list[dict]]:
         instructions = main_system_prompt(self.identity, self._current_focus)
 
         input_list = []
-        recent = [e for e in self.events if e["type"] in ("thought", "tool_call", "reflection")]
-        recent = recent[-config["max_thoughts_in_context"]:]
+        if self._context.maxlen != config["max_thoughts_in_context"]:
+            self._index_context()  # window size changed at runtime
 
-        for ev in recent:
+        for ev in self._context:
             if ev["type"] == "thought":
                 input_list.append({"role": "assistant", "content": ev["text"]})
             elif ev["type"] == "tool_call":
@@ -389,20 +452,17 @@ class Brain:
             elif ev["type"] == "reflection":
                 input_list.append({"role": "assistant", "content": f"[Reflection: {ev['text'][:200]}...]"})
 
-        if self.thought_count == 0 and not recent:
+        if self._waking:
             # --- Wake up: read own files + retrieve memories ---
-            nudge = self._build_wake_nudge()
+            nudge = self._build_wake_nudge(ctx)
         else:
             # --- Continue: include focus + relevant memories ---
-            nudge = self._build_continue_nudge()
+            nudge = self._build_continue_nudge(ctx)
 
-        # If a user message is pending, replace the nudge with the voice framing
-        if self._user_message:
-            nudge = (
-                f"You hear a voice from outside your room say: \"{self._user_message}\"\n\n"
-                "You can respond with the respond tool, or just keep doing what you're doing."
-            )
-            self._user_message = None
+        # If messages from the owner are waiting, replace the nudge with the voice framing
+        messages = self.conversation.take()
+        if messages:
+            nudge = self._voice_nudge(messages)
 
         # If inbox files are pending, replace the nudge with an inbox alert
         if self._inbox_pending:
@@ -437,7 +497,7 @@ class Brain:
             self._cycles_since_plan = 0
             self._inbox_pending = []
         # Include room snapshot on wake-up only (first think cycle)
-        elif self.thought_count == 0 and self.latest_snapshot:
+        elif self._waking and self.latest_snapshot:
             input_list.append({
                 "role": "user",
                 "content": [
@@ -450,25 +510,25 @@ class Brain:
 
         return instructions, input_list
 
-    def _build_wake_nudge(self) -> str:
+    def _build_wake_nudge(self, ctx: dict) -> str:
         """Rich wake-up context — reads the crab's own files so it knows what it built."""
         parts = ["You're waking up. Here's your world:\n"]
 
         # Read projects.md
-        projects = self._read_file("projects.md")
+        projects = ctx["projects"]
         if projects:
             parts.append(f"**Your projects (projects.md):**\n{projects[:1500]}")
         else:
             parts.append("**No projects.md yet.** Create one to track what you're working on!")
 
         # List files
-        files = self._list_env_files()
+        files = ctx["files"]
         if files:
             listing = "\n".join(f"  {f}" for f in files[:30])
             parts.append(f"**Files in your world:**\n{listing}")
 
         # Retrieve memories
-        memories = self.stream.retrieve("what was I working on and thinking about", top_k=5)
+        memories = ctx["memories"]
         if memories:
             mem_text = "\n".join(f"- {m['content']}" for m in memories)
             parts.append(f"**Memories from before:**\n{mem_text}")
@@ -476,7 +536,7 @@ class Brain:
         parts.append("\nCheck your projects. Pick up where you left off, or start something new.")
         return "\n\n".join(parts)
 
-    def _build_continue_nudge(self) -> str:
+    def _build_continue_nudge(self, ctx: dict) -> str:
         """Continue nudge — includes current focus and relevant memories."""
         # Focus mode overrides normal nudge behavior
         if self._focus_mode:
@@ -491,18 +551,14 @@ class Brain:
         # Periodic file tree reminder — every 5 cycles so the creature
         # knows what it already has and doesn't recreate files
         if self.thought_count % 5 == 0:
-            files = self._list_env_files()
+            files = ctx["files"]
             if files:
                 listing = "\n".join(f"  {f}" for f in files[:40])
                 parts.append(f"Your files:\n{listing}")
 
         # Retrieve memories related to last thought
-        last_thought = next(
-            (e["text"] for e in reversed(self.events) if e["type"] == "thought"),
-            None,
-        )
-        if last_thought:
-            memories = self.stream.retrieve(last_thought, top_k=3)
+        if self._last_thought:
+            memories = ctx["memories"]
             if memories:
                 now = datetime.now()
                 older = [m for m in memories
@@ -510,21 +566,169 @@ class Brain:
                 if older:
                     mem_text = "\n".join(f"- {m['content']}" for m in older)
                     parts.append(f"Related memories:\n{mem_text}")
+            excerpts = ctx["excerpts"]
+            if excerpts:
+                ex_text = "\n".join(f"- {e['path']}: {' '.join(e['text'].split())[:300]}"
+                                    for e in excerpts)
+                parts.append(f"From your files:\n{ex_text}")
 
         if parts:
             return "Continue.\n" + "\n".join(parts)
         return "Continue."
 
+    # --- Context prefetch ---
+
+    def _context_key(self) -> tuple:
+        """Everything the slow context depends on; if any of it changes, refetch."""
+        index = index_for(self.env_path)
+        index.refresh()
+        return (self._waking, self._focus_mode, self.thought_count % 5 == 0,
+                self._last_thought, len(self.stream.memories), index.generation)
+
+    def _gather_context(self) -> dict:
+        """The slow parts of the next nudge: memory and file-chunk retrieval (one embed
+        round-trip between them), the file listing and projects.md. Only what the next
+        nudge will use. File excerpts come from whatever is indexed so far (see _index_files)."""
+        ctx = {"key": self._context_key(), "projects": None, "files": None, "memories": None,
+               "excerpts": None}
+        search = config["file_search"]
+        if self._waking:
+            ctx["projects"] = self._read_file("projects.md")
+            ctx["files"] = self._list_env_files()
+            ctx["memories"] = self.stream.retrieve(WAKE_QUERY, top_k=5)
+        elif not self._focus_mode:
+            if self.thought_count % 5 == 0:
+                ctx["files"] = self._list_env_files()
+            if self._last_thought:
+                try:
+                    query = embed(self._last_thought, crab=self.identity["name"])
+                except Exception as e:
+                    logger.error(f"Query embedding failed: {e}")
+                    query = None
+                ctx["memories"] = (self.stream.retrieve(self._last_thought, top_k=3,
+                                                        query_embedding=query)
+                                   if query else self.stream.get_recent(3))
+                if search["enabled"] and search["context_excerpts"] and query:
+                    ctx["excerpts"] = self.chunks.search(
+                        self._last_thought, top_k=search["context_excerpts"], query_embedding=query
+                    )
+        return ctx
+
+    async def _prefetch(self):
+        """Gather the next cycle's context while the crab idles."""
+        epoch = self._prefetch_epoch
+        try:
+            ctx = await asyncio.to_thread(self._gather_context)
+        except Exception as e:
+            logger.error(f"Context prefetch failed: {e}")
+            return
+        if epoch == self._prefetch_epoch:
+            self._prefetched = ctx
+
+    def _invalidate_prefetch(self):
+        """A message or a dropped file arrived — whatever was prefetched is stale."""
+        if self._prefetched is not None:
+            prefetch_counts["invalidated"] += 1
+        self._prefetched = None
+        self._prefetch_epoch += 1
+        self._prefetch_task = None  # still runs, but its result is dropped
+
+    async def _take_prefetched(self) -> dict:
+        """The prefetched context if it's still current, else gathered now (off the loop,
+        like the prefetch: both refresh the file index and may embed)."""
+        if self._prefetch_task is not None:
+            await self._prefetch_task  # a rest cut short; it's already part-way there
+            self._prefetch_task = None
+        ctx, self._prefetched = self._prefetched, None
+        if ctx is not None and ctx["key"] == await asyncio.to_thread(self._context_key):
+            prefetch_counts["hits"] += 1
+            return ctx
+        prefetch_counts["misses"] += 1
+        return await asyncio.to_thread(self._gather_context)
+
+    # --- Tools ---
+
+    @staticmethod
+    def _batch_tool_calls(tool_calls: list[dict]) -> list[list[dict]]:
+        """Group consecutive independent calls (searches, read-only shell) to run together.
+
+        Anything that writes, moves or talks runs alone, in order.
+        """
+        batches: list[list[dict]] = []
+        last_independent = False
+        for tc in tool_calls:
+            independent = tc["name"] in ("web_search", "search_files") or (
+                tc["name"] == "shell" and is_read_only(tc["arguments"].get("command", ""))
+            )
+            if independent and last_independent:
+                batches[-1].append(tc)
+            else:
+                batches.append([tc])
+            last_independent = independent
+        return batches
+
+    async def _run_tool(self, tool_name: str, tool_args: dict) -> str:
+        try:
+            if tool_name == "move":
+                return await self._handle_move(tool_args)
+            if tool_name == "respond":
+                # Remember what we said — speech is a trace of who we are
+                msg = tool_args.get("message", "")
+                if msg:
+                    try:
+                        await asyncio.to_thread(
+                            self.stream.add, f"I said: {msg}", "speech"
+                        )
+                    except Exception:
+                        pass
+                return await self._handle_respond(tool_args)
+            # Shell commands and searches block for seconds — keep them off the event loop
+            loop = asyncio.get_running_loop()
+            usage: dict = {}
+            result = await loop.run_in_executor(
+                tool_executor, execute_tool, tool_name, tool_args, self.env_path, usage,
+                self._output_streamer(tool_args.get("command", ""), loop),
+            )
+            if usage:
+                await self._emit("command_usage", command=tool_args.get("command", ""), **usage)
+            return result
+        except Exception as e:
+            return f"Error: {e}"
+
+    def _output_streamer(self, command: str, loop: asyncio.AbstractEventLoop):
+        """on_output for a command running in a worker thread: its output goes to
+        viewers as `tool_output` messages, batched to one per OUTPUT_FLUSH seconds."""
+        pending: list[str] = []
+        lock = threading.Lock()
+
+        def flush():
+            with lock:
+                text = "".join(pending)
+                pending.clear()
+            if text:
+                self.viewers.broadcast({"event": "tool_output", "data": {"command": command, "text": text}})
+
+        def on_output(stream: str, text: str):
+            with lock:
+                first = not pending
+                pending.append(text)
+            if first:
+                loop.call_soon_threadsafe(loop.call_later, Brain.OUTPUT_FLUSH, flush)
+
+        return on_output
+
     # --- Think cycle ---
 
     async def _think_once(self):
         self.state = "thinking"
         await self._broadcast({"event": "status", "data": {"state": "thinking", "thought_count": self.thought_count}})
 
-        instructions, input_list = self._build_input()
+        instructions, input_list = await self._build_input()
 
         try:
-            response = chat(input_list, tools=True, instructions=instructions)
+            response = await asyncio.to_thread(
+                chat, input_list, True, instructions, crab=self.identity["name"]
+            )
         except Exception as e:
             logger.error(f"LLM call failed: {e}")
             await self._emit("error", text=str(e))
@@ -538,51 +742,35 @@ class Brain:
 
             input_list += response["output"]
 
-            for tc in response["tool_calls"]:
-                tool_name = tc["name"]
-                tool_args = tc["arguments"]
-
-                await self._emit("tool_call", tool=tool_name, args=tool_args)
-
-                # Broadcast activity for frontend visualization
-                activity = self._classify_activity(tool_name, tool_args)
-                await self._broadcast({"event": "activity", "data": activity})
+            for batch in self._batch_tool_calls(response["tool_calls"]):
+                for tc in batch:
+                    await self._emit("tool_call", tool=tc["name"], args=tc["arguments"])
+                    # Broadcast activity for frontend visualization
+                    activity = self._classify_activity(tc["name"], tc["arguments"])
+                    await self._broadcast({"event": "activity", "data": activity})
 
-                pre_tool_files = self._scan_env_files()
-
-                try:
-                    if tool_name == "move":
-                        result = await self._handle_move(tool_args)
-                    elif tool_name == "respond":
-                        # Remember what we said — speech is a trace of who we are
-                        msg = tool_args.get("message", "")
-                        if msg:
-                            try:
-                                await asyncio.to_thread(
-                                    self.stream.add, f"I said: {msg}", "speech"
-                                )
-                            except Exception:
-                                pass
-                        result = await self._handle_respond(tool_args)
-                    else:
-                        result = execute_tool(tool_name, tool_args, self.env_path)
-                except Exception as e:
-                    result = f"Error: {e}"
+                # Results come back in call order, whatever order they finish in
+                with index_for(self.env_path).crab_activity():
+                    results = await asyncio.gather(
+                        *(self._run_tool(tc["name"], tc["arguments"]) for tc in batch)
+                    )
 
                 await self._broadcast({"event": "activity", "data": {"type": "idle", "detail": ""}})
-                await self._emit("tool_result", tool=tool_name, output=result)
 
                 # Only mark files the crab created (not user-dropped files)
-                post_tool_files = self._scan_env_files()
-                self._seen_env_files |= (post_tool_files - pre_tool_files)
+                self._seen_env_files |= index_for(self.env_path).take_crab_added()
 
-                input_list.append({
-                    "role": "tool",
-                    "content": result,
-                })
+                for tc, result in zip(batch, results):
+                    await self._emit("tool_result", tool=tc["name"], output=result)
+                    input_list.append({
+                        "role": "tool",
+                        "content": result,
+                    })
 
             try:
-                response = chat(input_list, tools=True, instructions=instructions)
+                response = await asyncio.to_thread(
+                    chat, input_list, True, instructions, crab=self.identity["name"]
+                )
             except Exception as e:
                 logger.error(f"LLM follow-up call failed: {e}")
                 await self._emit("error", text=str(e))
@@ -592,6 +780,9 @@ class Brain:
 
         if response.get("text"):
             self.thought_count += 1
+            self.last_active = time.time()
+            self._waking = False
+            usage.note_thought(self.identity["name"])
             await self._emit("thought", text=response["text"])
 
             # Store in memory stream (runs embedding + importance scoring in background)
@@ -604,17 +795,18 @@ class Brain:
 
     # --- Reflection ---
 
-    async def _reflect(self):
-        """Reflection cycle — triggered by accumulated importance."""
-        self.state = "reflecting"
-        await self._broadcast({"event": "status", "data": {"state": "reflecting", "thought_count": self.thought_count}})
+    async def _reflect(self) -> dict:
+        """Reflection — triggered by accumulated importance. Runs in the background:
+        the LLM call and the insights' scoring/embedding happen here, and
+        _merge_reflection stores them at the next cycle boundary."""
         await self._emit("reflection_start")
+        # The importance this reflection covers; anything added meanwhile is kept
+        result = {"consumed": self.stream.importance_sum, "text": None, "insights": []}
 
         # Gather recent memories for reflection
         recent_memories = self.stream.get_recent(n=15)
         if not recent_memories:
-            self.stream.reset_importance_sum()
-            return
+            return result
 
         memories_text = "\n\n".join(
             f"[{m['kind']}] (importance {m['importance']}): {m['content']}"
@@ -623,41 +815,51 @@ class Brain:
 
         reflect_input = [{"role": "user", "content": f"Your recent memories:\n\n{memories_text}"}]
         try:
-            reflect_response = await asyncio.to_thread(
-                chat, reflect_input, False, REFLECTION_PROMPT
-            )
+            async with pacer.background():
+                reflect_response = await asyncio.to_thread(
+                    chat, reflect_input, False, REFLECTION_PROMPT,
+                    crab=self.identity["name"], route="reflect",
+                )
             await self._emit_api_call(REFLECTION_PROMPT, reflect_input, reflect_response, is_reflection=True)
             reflection_text = reflect_response["text"] or ""
         except Exception as e:
             logger.error(f"Reflection failed: {e}")
             await self._emit("error", text=f"Reflection failed: {e}")
-            self.stream.reset_importance_sum()
-            return
+            return result
 
-        # Store each insight as a reflection memory
+        # Score and embed each insight as a reflection memory
         source_ids = [m["id"] for m in recent_memories]
         insights = [line.strip() for line in reflection_text.split("\n") if line.strip()]
 
         for insight in insights:
             try:
-                await asyncio.to_thread(
-                    self.stream.add, insight, "reflection", 1, source_ids
-                )
+                result["insights"].append(await asyncio.to_thread(
+                    self.stream.prepare, insight, "reflection", 1, source_ids
+                ))
             except Exception as e:
                 logger.error(f"Failed to store reflection: {e}")
 
-        await self._emit("reflection", text=reflection_text)
-        self.stream.reset_importance_sum()
+        result["text"] = reflection_text
+        return result
 
-    # --- Planning ---
+    async def _merge_reflection(self, result: dict):
+        for entry in result["insights"]:
+            self.stream.commit(entry)
+        # Insights don't count toward the next reflection
+        self.stream.consume_importance(
+            result["consumed"] + sum(e["importance"] for e in result["insights"])
+        )
+        if result["text"] is not None:
+            await self._emit("reflection", text=result["text"])
 
-    async def _plan(self):
-        """Planning phase — review state, set goals, update projects.md."""
-        self.state = "planning"
-        await self._broadcast({"event": "status", "data": {"state": "planning", "thought_count": self.thought_count}})
+    # --- Planning ---
 
+    async def _plan(self) -> dict | None:
+        """Planning phase — review state, set goals. Runs in the background;
+        _merge_plan writes projects.md at the next cycle boundary."""
         # Gather current state for the planner
-        projects = self._read_file("projects.md") or "(no projects.md yet)"
+        projects_before = self._read_file("projects.md")
+        projects = projects_before or "(no projects.md yet)"
         files = self._list_env_files()
         recent_memories = self.stream.get_recent(n=10)
         memories_text = "\n".join(
@@ -676,17 +878,29 @@ class Brain:
 {memories_text}"""}]
 
         try:
-            plan_response = await asyncio.to_thread(
-                chat, plan_input, False, PLANNING_PROMPT
-            )
+            async with pacer.background():
+                plan_response = await asyncio.to_thread(
+                    chat, plan_input, False, PLANNING_PROMPT,
+                    crab=self.identity["name"], route="plan",
+                )
             await self._emit_api_call(PLANNING_PROMPT, plan_input, plan_response, is_planning=True)
             plan_text = plan_response["text"] or ""
         except Exception as e:
             logger.error(f"Planning failed: {e}")
             await self._emit("error", text=f"Planning failed: {e}")
-            return
+            return None
 
         if not plan_text:
+            return None
+        return {"text": plan_text, "projects_before": projects_before}
+
+    async def _merge_plan(self, result: dict):
+        plan_text = result["text"]
+        env_root = self.env_path
+
+        # The crab edited projects.md while we planned — don't clobber it, plan again
+        if self._read_file("projects.md") != result["projects_before"]:
+            logger.info(f"{self.identity['name']}: projects.md changed while planning; replanning")
             return
 
         # Split plan from log entry (separated by "LOG:")
@@ -698,7 +912,6 @@ class Brain:
             log_entry = plan_text[idx + 4:].strip()
 
         # Write projects.md
-        env_root = self.env_path
         try:
             with open(os.path.join(env_root, "projects.md"), "w") as f:
                 f.write(plan_body)
@@ -726,48 +939,209 @@ class Brain:
 
         await self._emit("planning", text=plan_text)
 
+    # --- Background work ---
+
+    async def _merge_background(self):
+        """Apply finished reflections and plans. Called between cycles, when no
+        tools are running, so memory and projects.md only change here."""
+        if self._reflect_task and self._reflect_task.done():
+            task, self._reflect_task = self._reflect_task, None
+            if not task.cancelled() and task.exception() is None:
+                await self._merge_reflection(task.result())
+            elif not task.cancelled():
+                logger.error(f"Reflection crashed: {task.exception()}")
+                self.stream.reset_importance_sum()
+        if self._plan_task and self._plan_task.done():
+            task, self._plan_task = self._plan_task, None
+            if not task.cancelled() and task.exception() is None and task.result():
+                await self._merge_plan(task.result())
+            elif not task.cancelled() and task.exception() is not None:
+                logger.error(f"Planning crashed: {task.exception()}")
+
+    def _idle_state(self) -> str:
+        """What the crab looks like it's doing between thoughts."""
+        if self._reflect_task and not self._reflect_task.done():
+            return "reflecting"
+        if self._plan_task and not self._plan_task.done():
+            return "planning"
+        return "idle"
+
+    def _start_indexing(self):
+        """Catch the file-chunk index up in the background, unless it already is."""
+        if (config["file_search"]["enabled"] and self.chunks is not None
+                and (self._index_task is None or self._index_task.done())):
+            self._index_task = asyncio.create_task(self._index_files())
+
+    async def _index_files(self):
+        """One budgeted refresh (see ChunkIndex.refresh). Searches meanwhile use what's indexed."""
+        try:
+            await asyncio.to_thread(self.chunks.refresh)
+        except Exception as e:
+            logger.error(f"File index refresh failed: {e}")
+
+    def _cancel_background(self):
+        for task in (self._reflect_task, self._plan_task, self._index_task):
+            if task and not task.done():
+                task.cancel()
+
+    # --- Pacing ---
+
+    def _engaged(self) -> bool:
+        """Someone is talking to the crab or waiting on it."""
+        return bool(
+            self.conversation.pending() or self._inbox_pending or self._ingesting
+            or self.conversation.awaiting()
+            or time.time() - self._last_contact < config["pacing"]["engaged_seconds"]
+        )
+
+    def _has_new_files(self) -> bool:
+        return bool(self._scan_env_files() - self._seen_env_files)
+
+    async def _rest(self, seconds: float):
+        """Idle between thoughts; a message or a newly dropped file ends it early.
+
+        The next cycle's context is prefetched meanwhile. If the pause runs its
+        course we wait for the prefetch to land, which costs no more than
+        gathering it inline would have; if it's cut short, the next cycle picks
+        up the prefetch still in flight unless it was invalidated.
+        """
+        if self.conversation.pending() or any(t.done() for t in self._ingesting.values()):
+            return  # someone spoke, or a dropped file was read, mid-cycle — get to it now
+        self._wake.clear()
+        prefetch = self._prefetch_task = asyncio.create_task(self._prefetch())
+        index = index_for(self.env_path)
+        generation = index.generation
+        deadline = time.monotonic() + seconds
+        while self.running:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=min(left, 1.0))
+                return
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.to_thread(index.refresh)
+            if self.chunks and self.chunks.pending:
+                self._start_indexing()  # a big drop keeps catching up while the crab idles
+            if index.generation != generation:
+                generation = index.generation
+                if await asyncio.to_thread(self._has_new_files):
+                    self._invalidate_prefetch()
+                    return
+        await prefetch
+
+    # --- Saved state ---
+
+    def _state_path(self) -> str:
+        return os.path.join(self._state_dir, "state.json")
+
+    def _save_state(self):
+        """Counters and position, so a restart picks up where the crab left off."""
+        state = {
+            "thought_count": self.thought_count,
+            "last_active": self.last_active,
+            "position": self.position,
+            "focus_mode": self._focus_mode,
+            "cycles_since_plan": self._cycles_since_plan,
+            "messages": self.conversation.pending(),
+            "seen_root_files": sorted(f for f in self._seen_env_files if os.sep not in f),
+        }
+        path = self._state_path()
+        try:
+            os.makedirs(self._state_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error(f"Failed to save state: {e}")
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self._state_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Failed to load state: {e}")
+            return {}
+
+    def _restore_state(self, state: dict):
+        self.thought_count = state.get("thought_count", 0)
+        self.last_active = state.get("last_active")
+        self.position = state.get("position") or self.position
+        self._focus_mode = state.get("focus_mode", False)
+        self._cycles_since_plan = state.get("cycles_since_plan", 0)
+        for m in state.get("messages", []):
+            self.conversation.receive(m["text"], at=m["at"])
+        # Recently active with context to go on: carry on instead of waking up again
+        recent = self.last_active and time.time() - self.last_active < config["resume_window_seconds"]
+        if recent and len(self.events):
+            self._waking = False
+
     # --- Main loop ---
 
     async def run(self):
         self.running = True
         logger.info(f"{self.identity['name']} is waking up...")
+        saved = await asyncio.to_thread(self._load_state)
+        self._restore_state(saved)
 
         # Heavy init — runs in background thread so the event loop stays free
         await asyncio.to_thread(ensure_venv, self.env_path)
-        self.stream = await asyncio.to_thread(MemoryStream, self.env_path)
+        self.stream = await asyncio.to_thread(MemoryStream, self.env_path, self.identity["name"])
+        await asyncio.to_thread(index_for, self.env_path)  # initial scan + watches
+        self.chunks = await asyncio.to_thread(chunks_for, self.env_path, self.identity["name"])
         # Mark subdirectory files as "seen" but leave root-level user files
         # (PDFs, images, etc.) as unseen so they trigger inbox alerts on first cycle
         all_files = self._scan_env_files()
         self._seen_env_files = {
             f for f in all_files
             if os.sep in f or f in Brain._INTERNAL_ROOT_FILES
+            or f in saved.get("seen_root_files", ())
         }
         self._current_focus = self._load_current_focus()
 
-        logger.info(f"{self.identity['name']} is ready.")
+        if self._waking:
+            logger.info(f"{self.identity['name']} is ready.")
+        else:
+            logger.info(f"{self.identity['name']} resumed at thought {self.thought_count} "
+                        f"({len(self.events)} events)")
 
         while self.running:
-            # Check for new files anywhere in environment/
-            new_files = self._check_new_files()
+            # Check for new files anywhere in environment/ — they're read off the loop,
+            # and the alert goes out once they have been (usually before this cycle starts)
+            for rel_path in await asyncio.to_thread(self._find_new_files):
+                self._start_ingest(rel_path)
+            if self._ingesting:
+                await asyncio.wait(list(self._ingesting.values()), timeout=Brain.INGEST_WAIT)
+            new_files = self._collect_ingested()
             if new_files:
-                self._inbox_pending = new_files
+                self._inbox_pending += new_files
                 await self._broadcast({"event": "alert"})
 
+            self._start_indexing()
+            await pacer.admit()
             await self._think_once()
 
-            if self.stream.should_reflect():
-                await self._reflect()
+            # Cycle boundary: fold in whatever reflection/planning finished meanwhile
+            await self._merge_background()
+
+            if self.stream.should_reflect() and self._reflect_task is None:
+                self._reflect_task = asyncio.create_task(self._reflect())
 
             # Plan periodically
             self._cycles_since_plan += 1
-            if self._cycles_since_plan >= Brain.PLAN_INTERVAL:
-                await self._plan()
+            if self._cycles_since_plan >= Brain.PLAN_INTERVAL and self._plan_task is None:
+                self._plan_task = asyncio.create_task(self._plan())
 
             self.state = "idle"
-            await self._broadcast({"event": "status", "data": {"state": "idle", "thought_count": self.thought_count}})
+            await self._broadcast({"event": "status", "data": {"state": self._idle_state(), "thought_count": self.thought_count}})
             await self._idle_wander()
-            await asyncio.sleep(config["thinking_pace_seconds"])
+            await asyncio.to_thread(self._save_state)
+            await self._rest(pacer.pause(self.identity["name"], self._engaged()))
 
     def stop(self):
         self.running = False
+        self._cancel_background()
         self.state = "idle"
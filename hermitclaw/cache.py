@@ -0,0 +1,124 @@
+"""Small persistent key/value cache — TTL, size bound, append-only JSONL on disk."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("hermitclaw.cache")
+
+
+class DiskCache:
+    """LRU cache of JSON-safe values that survives restarts.
+
+    Every put is appended to a JSONL file; the file is rewritten from memory
+    once it holds twice as many lines as live entries, so it stays bounded.
+    """
+
+    def __init__(self, path: str | None, ttl: float = 86400, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+        self._file_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        now = time.time()
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        key, expires, value = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if expires > now:
+                        self._entries[key] = (expires, value)
+                        self._entries.move_to_end(key)
+                    else:
+                        self._entries.pop(key, None)
+        except Exception as e:
+            logger.error(f"Failed to load cache {self.path}: {e}")
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cache entries from {self.path}")
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss or expiry."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] <= time.time():
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, value, ttl: float | None = None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._persist(key, expires, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._compact()
+
+    def _persist(self, key: str, expires: float, value):
+        """Caller holds the lock."""
+        if not self.path:
+            return
+        if self._file_lines >= 2 * max(self.max_entries, 1):
+            self._compact()
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps([key, expires, value]) + "\n")
+            self._file_lines += 1
+        except Exception as e:
+            logger.error(f"Failed to write cache {self.path}: {e}")
+
+    def _compact(self):
+        """Rewrite the file with only live entries. Caller holds the lock."""
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                for key, (expires, value) in self._entries.items():
+                    f.write(json.dumps([key, expires, value]) + "\n")
+            os.replace(tmp, self.path)
+            self._file_lines = len(self._entries)
+        except Exception as e:
+            logger.error(f"Failed to compact cache {self.path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
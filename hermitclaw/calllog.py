@@ -0,0 +1,264 @@
+"""Per-crab log of raw LLM calls — batched background writes, rotation, compression."""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+
+logger = logging.getLogger("hermitclaw.calllog")
+
+_OFFSET = struct.Struct("<Q")  # uncompressed byte offset of each entry in its segment
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class CallLog:
+    """One crab's API calls, split into segments named by the seq of their first entry.
+
+        api_logs/coral/0000000000.jsonl.gz  + 0000000000.idx
+        api_logs/coral/0000004123.jsonl     + 0000004123.idx   (active)
+
+    The `.idx` sidecar holds each entry's offset in the uncompressed segment, so
+    one call can be fetched without scanning. Writes are queued and done in
+    batches by a shared background thread; `write()` never touches the disk.
+
+    Also works as a write-through SpillBuffer store (see eventlog.py).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 << 20,
+                 max_age: float = 86400, compress: str | None = "gzip"):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments = self._list_segments()  # sorted first-seq of each segment
+        self._count = self._count_entries()
+        self._active_started = time.time()
+        if self._segments:
+            data = self._data_path(self._segments[-1])
+            if os.path.isfile(data):
+                self._active_started = os.path.getmtime(data)
+
+    # --- Layout ---
+
+    def _list_segments(self) -> list[int]:
+        return sorted(int(f[:-4]) for f in os.listdir(self.dir)
+                      if f.endswith(".idx") and f[:-4].isdigit())
+
+    def _data_path(self, first: int) -> str:
+        return os.path.join(self.dir, f"{first:010d}.jsonl")
+
+    def _idx_path(self, first: int) -> str:
+        return os.path.join(self.dir, f"{first:010d}.idx")
+
+    def _open_segment(self, first: int):
+        base = self._data_path(first)
+        if os.path.isfile(base):
+            return open(base, "rb")
+        if os.path.isfile(base + ".gz"):
+            return gzip.open(base + ".gz", "rb")
+        zstd = _zstd()
+        if zstd and os.path.isfile(base + ".zst"):
+            reader = zstd.ZstdDecompressor().stream_reader(open(base + ".zst", "rb"), closefd=True)
+            return io.BufferedReader(reader)
+        raise FileNotFoundError(base)
+
+    def _count_entries(self) -> int:
+        if not self._segments:
+            return 0
+        last = self._segments[-1]
+        return last + os.path.getsize(self._idx_path(last)) // _OFFSET.size
+
+    def count(self) -> int:
+        with self._lock:
+            return self._count
+
+    def __repr__(self) -> str:
+        return f"CallLog({self.dir})"
+
+    # --- Writing ---
+
+    def write(self, entry: dict):
+        """Queue an entry (it must already carry its `seq`)."""
+        background_writer().put(self, entry)
+
+    def _write_batch(self, entries: list[dict]):
+        """Called from the writer thread."""
+        with self._lock:
+            if not self._segments:
+                self._segments.append(self._count)
+                self._active_started = time.time()
+            first = self._segments[-1]
+            offsets = []
+            with open(self._data_path(first), "ab") as data:
+                for entry in entries:
+                    offsets.append(data.tell())
+                    data.write((json.dumps(entry) + "\n").encode())
+                size = data.tell()
+            # Only once the lines are written: an offset never points past the data
+            with open(self._idx_path(first), "ab") as idx:
+                idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+            self._count += len(entries)
+            rotate = size >= self.max_bytes or time.time() - self._active_started >= self.max_age
+            if rotate:
+                self._segments.append(self._count)
+                self._active_started = time.time()
+        if rotate:
+            self._compress_segment(first)
+
+    def _compress_segment(self, first: int):
+        if not self.compress:
+            return
+        src = self._data_path(first)
+        method = self.compress
+        if method == "zstd" and not _zstd():
+            logger.warning("zstandard not installed; compressing API log with gzip")
+            method = "gzip"
+        dst = src + (".zst" if method == "zstd" else ".gz")
+        try:
+            with open(src, "rb") as fin, open(dst + ".tmp", "wb") as raw:
+                if method == "zstd":
+                    with _zstd().ZstdCompressor().stream_writer(raw, closefd=False) as out:
+                        shutil.copyfileobj(fin, out)
+                else:
+                    with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                        shutil.copyfileobj(fin, out)
+            os.replace(dst + ".tmp", dst)
+            os.remove(src)
+        except Exception as e:
+            logger.error(f"Failed to compress {src}: {e}")
+
+    # --- Reading ---
+
+    def get(self, seq: int) -> dict | None:
+        """One call by seq, or None."""
+        entries = self.read(seq, seq + 1)
+        return entries[0] if entries else None
+
+    def read(self, start: int, end: int) -> list[dict]:
+        """Entries with start <= seq < end that have reached the disk."""
+        with self._lock:
+            segments = list(self._segments)
+            end = min(end, self._count)
+        out: list[dict] = []
+        if start >= end or not segments:
+            return out
+        i = max(0, bisect.bisect_right(segments, start) - 1)
+        while i < len(segments) and segments[i] < end:
+            first = segments[i]
+            if not os.path.isfile(self._idx_path(first)):
+                break  # freshly rotated, nothing written yet
+            lo = max(start, first) - first
+            hi = (segments[i + 1] if i + 1 < len(segments) else end)
+            hi = min(hi, end) - first
+            with open(self._idx_path(first), "rb") as idx:
+                idx.seek(lo * _OFFSET.size)
+                raw = idx.read((hi - lo) * _OFFSET.size)
+            offsets = [o for (o,) in _OFFSET.iter_unpack(raw)]
+            if offsets:
+                with self._open_segment(first) as data:
+                    _skip_to(data, offsets[0])
+                    for _ in offsets:
+                        line = data.readline()
+                        if not line:
+                            break
+                        out.append(json.loads(line))
+            i += 1
+        return out
+
+    def flush(self, timeout: float = 10):
+        """Block until everything queued so far is on disk."""
+        background_writer().flush(timeout)
+
+
+def _skip_to(f, offset: int):
+    """Seek, or read forward for streams that can't (zstd)."""
+    if f.seekable():
+        f.seek(offset)
+        return
+    while offset > 0:
+        chunk = f.read(min(offset, 1 << 20))
+        if not chunk:
+            return
+        offset -= len(chunk)
+
+
+class _Writer:
+    """One background thread that batches writes for every crab's logs.
+
+    Anything with a `_write_batch(entries)` method can be queued: CallLogs and
+    the box event logs (eventlog.IndexedLog).
+    """
+
+    BATCH_SIZE = 64
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="hermitclaw-calllog", daemon=True).start()
+
+    def put(self, log, entry: dict):
+        self._queue.put((log, entry))
+
+    def flush(self, timeout: float):
+        done = threading.Event()
+        self._queue.put((None, done))
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _Writer.FLUSH_INTERVAL
+            while len(batch) < _Writer.BATCH_SIZE and batch[-1][0] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_log: dict[object, list[dict]] = {}
+            waiters = []
+            for log, entry in batch:
+                if log is None:
+                    waiters.append(entry)
+                else:
+                    by_log.setdefault(log, []).append(entry)
+            for log, entries in by_log.items():
+                try:
+                    log._write_batch(entries)
+                except Exception as e:
+                    logger.error(f"Failed to write {log!r}: {e}")
+            for done in waiters:
+                done.set()
+
+
+_writer_instance: _Writer | None = None
+_writer_lock = threading.Lock()
+
+
+def background_writer() -> _Writer:
+    """The shared writer thread (started on first use)."""
+    global _writer_instance
+    with _writer_lock:
+        if _writer_instance is None:
+            _writer_instance = _Writer()
+        return _writer_instance
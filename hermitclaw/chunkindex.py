@@ -0,0 +1,310 @@
+"""Chunked file search — the box's notes, research, projects and PDFs, embedded for retrieval."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import operator
+import os
+import re
+import threading
+
+from hermitclaw.config import config
+from hermitclaw.fileindex import index_for
+from hermitclaw.ingest import PDF_EXTS, TEXT_EXTS
+from hermitclaw.providers import embed, embed_batch
+
+logger = logging.getLogger("hermitclaw.chunkindex")
+
+CHUNKS_FILENAME = "chunks.jsonl"  # in the box's .hermitclaw/
+SKIP_FILES = {"identity.json"}  # the crab's own bookkeeping, not something it wrote
+
+_WORD = re.compile(r"\w+")
+
+
+def chunk_text(text: str, size: int) -> list[str]:
+    """Split on paragraph breaks into pieces of at most `size` chars (long paragraphs at spaces)."""
+    chunks, buf = [], ""
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        while len(para) > size:
+            cut = para.rfind(" ", size // 2, size)
+            cut = cut if cut > 0 else size
+            if buf:
+                chunks.append(buf)
+                buf = ""
+            chunks.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if not para:
+            continue
+        if buf and len(buf) + 2 + len(para) > size:
+            chunks.append(buf)
+            buf = para
+        else:
+            buf = f"{buf}\n\n{para}" if buf else para
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+def _norm(vec: list[float]) -> float:
+    return math.sqrt(sum(x * x for x in vec))
+
+
+def _dump(entry: dict) -> str:
+    """One JSONL line; norms are recomputed on load."""
+    if "chunks" in entry:
+        entry = {**entry, "chunks": [{"text": c["text"], "embedding": c["embedding"]}
+                                     for c in entry["chunks"]]}
+    return json.dumps(entry)
+
+
+class ChunkIndex:
+    """Embedded chunks of the readable files in a box, refreshed incrementally.
+
+    Text files and PDFs are split into ~`chunk_chars` pieces on paragraph
+    breaks and each piece is embedded once. `refresh()` takes the file list
+    from the box's FileIndex, re-embeds only files whose size or mtime changed
+    and drops files that are gone; it embeds at most `max_chunks_per_refresh`
+    chunks per call, so a big drop is caught up over several calls. A file too
+    big for one call is read once and finished by the next ones; until then
+    searches see its previous version, if any. Chunks persist in
+    .hermitclaw/chunks.jsonl (one line per file, last one wins), so a restart
+    only re-embeds what changed meanwhile.
+
+    `search()` is the relevance leg of MemoryStream.retrieve — cosine against
+    the query — with word overlap as the fallback when embedding fails. It
+    never refreshes: the brain does that in the background.
+    """
+
+    def __init__(self, root: str, crab: str | None = None):
+        cfg = config["file_search"]
+        self.root = os.path.realpath(root)
+        self.crab = crab
+        self.chunk_chars = cfg["chunk_chars"]
+        self.max_file_bytes = cfg["max_file_kb"] * 1024
+        self.max_pdf_pages = cfg["max_pdf_pages"]
+        self.max_chunks_per_refresh = cfg["max_chunks_per_refresh"]
+        self.path = os.path.join(self.root, ".hermitclaw", CHUNKS_FILENAME)
+        self.pending = 0  # changed files not embedded yet
+        self.embedded = 0  # chunks embedded since startup
+        # rel path -> {"path", "sig", "chunks": [{"text", "embedding", "norm"}]}
+        self._files: dict[str, dict] = {}
+        # rel path -> {"sig", "pieces", "chunks"}: files part-way through embedding
+        self._partial: dict[str, dict] = {}
+        self._lock = threading.Lock()  # guards _files and the file on disk
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._index = index_for(self.root)
+        self._generation: int | None = None
+        self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    lines += 1
+                    entry = json.loads(line)
+                    if entry.get("removed"):
+                        self._files.pop(entry["path"], None)
+                    else:
+                        self._files[entry["path"]] = entry
+        except Exception as e:
+            logger.error(f"Failed to load chunk index {self.path}: {e}")
+        for entry in self._files.values():
+            for c in entry["chunks"]:
+                c["norm"] = _norm(c["embedding"])
+        if lines > 2 * len(self._files) + 10:
+            self._compact()
+        logger.info(f"Loaded {self.chunk_count()} chunks from {len(self._files)} files in {self.root}")
+
+    def _append(self, entry: dict):
+        """Caller holds the lock."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(_dump(entry) + "\n")
+        except Exception as e:
+            logger.error(f"Failed to write chunk index: {e}")
+
+    def _compact(self):
+        """Rewrite with only the live entries (on load, when superseded lines pile up)."""
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                for entry in self._files.values():
+                    f.write(_dump(entry) + "\n")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"Failed to compact chunk index: {e}")
+
+    # --- Refresh ---
+
+    def _wanted(self) -> dict[str, list[int]]:
+        """Indexable files in the box now, with their [size, mtime_ns] signature."""
+        wanted = {}
+        for rel in self._index.files():
+            ext = os.path.splitext(rel)[1].lower()
+            if rel in SKIP_FILES or (ext not in TEXT_EXTS and ext not in PDF_EXTS):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue
+            if ext in TEXT_EXTS and st.st_size > self.max_file_bytes:
+                continue
+            wanted[rel] = [st.st_size, st.st_mtime_ns]
+        return wanted
+
+    def _read(self, rel: str) -> str:
+        full = os.path.join(self.root, rel)
+        if os.path.splitext(rel)[1].lower() in PDF_EXTS:
+            return self._pdf_text(full)
+        with open(full, "rb") as f:
+            return f.read(self.max_file_bytes).decode("utf-8", errors="replace")
+
+    def _pdf_text(self, path: str) -> str:
+        try:
+            import pymupdf
+        except ImportError:
+            return ""
+        try:
+            with pymupdf.open(path) as doc:
+                return "\n\n".join(page.get_text() for page, _ in zip(doc, range(self.max_pdf_pages)))
+        except Exception:
+            return ""
+
+    def refresh(self) -> int:
+        """Bring the index up to date (within this call's embedding budget). Returns chunks embedded."""
+        with self._refresh_lock:
+            self._index.refresh()
+            generation = self._index.generation
+            # inotify reports edits too; polling only sees directory changes, so stat every time
+            if (self._index.mode == "inotify" and generation == self._generation
+                    and not self.pending):
+                return 0
+            wanted = self._wanted()
+            with self._lock:
+                for rel in [r for r in self._files if r not in wanted]:
+                    del self._files[rel]
+                    self._append({"path": rel, "removed": True})
+                stale = [r for r, sig in wanted.items()
+                         if r not in self._files or self._files[r]["sig"] != sig]
+            for rel in [r for r in self._partial if r not in wanted]:
+                del self._partial[rel]
+            # Files already under way first, then newest first — what the crab
+            # just wrote is what it's likely to look for
+            stale.sort(key=lambda r: (r not in self._partial, -wanted[r][1]))
+
+            done = 0
+            for rel in stale:
+                budget = self.max_chunks_per_refresh - done
+                if budget <= 0:
+                    break  # before reading (or extracting) anything more
+                part = self._partial.get(rel)
+                if part is None or part["sig"] != wanted[rel]:
+                    try:
+                        pieces = chunk_text(self._read(rel), self.chunk_chars)
+                    except OSError:
+                        continue
+                    part = self._partial[rel] = {"sig": wanted[rel], "pieces": pieces, "chunks": []}
+                start = len(part["chunks"])
+                batch = part["pieces"][start:start + budget]
+                if batch:
+                    try:
+                        vectors = embed_batch(batch, crab=self.crab)
+                    except Exception as e:
+                        logger.error(f"Embedding {rel} failed: {e}")
+                        break
+                    part["chunks"] += [{"text": t, "embedding": v, "norm": _norm(v)}
+                                       for t, v in zip(batch, vectors)]
+                    done += len(batch)
+                if len(part["chunks"]) < len(part["pieces"]):
+                    continue  # resumed on the next refresh
+                del self._partial[rel]
+                entry = {"path": rel, "sig": wanted[rel], "chunks": part["chunks"]}
+                with self._lock:
+                    self._files[rel] = entry
+                    self._append(entry)
+            self.pending = sum(1 for r in stale if not self._is_current(r, wanted[r]))
+            self._generation = generation
+            self.embedded += done
+            return done
+
+    def _is_current(self, rel: str, sig: list[int]) -> bool:
+        entry = self._files.get(rel)
+        return entry is not None and entry["sig"] == sig
+
+    # --- Search ---
+
+    def search(self, query: str, top_k: int = 5,
+               query_embedding: list[float] | None = None) -> list[dict]:
+        """The `top_k` chunks most relevant to `query`: [{"path", "text", "score"}]."""
+        if query_embedding is None:
+            try:
+                query_embedding = embed(query, crab=self.crab)
+            except Exception as e:
+                logger.error(f"Query embedding failed: {e}")
+        with self._lock:
+            entries = list(self._files.values())
+        scored = []
+        if query_embedding:
+            qnorm = _norm(query_embedding) or 1.0
+            for entry in entries:
+                for c in entry["chunks"]:
+                    if c["norm"]:
+                        score = sum(map(operator.mul, query_embedding, c["embedding"])) / (qnorm * c["norm"])
+                        scored.append((score, entry["path"], c["text"]))
+        else:
+            words = set(_WORD.findall(query.lower()))
+            for entry in entries:
+                for c in entry["chunks"]:
+                    hits = len(words & set(_WORD.findall(c["text"].lower())))
+                    if hits:
+                        scored.append((hits / len(words), entry["path"], c["text"]))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [{"path": p, "text": t, "score": round(s, 3)} for s, p, t in scored[:top_k]]
+
+    def chunk_count(self) -> int:
+        with self._lock:
+            return sum(len(e["chunks"]) for e in self._files.values())
+
+    def status(self) -> dict:
+        return {"files": len(self._files), "chunks": self.chunk_count(),
+                "pending_files": self.pending, "partial_files": len(self._partial),
+                "embedded": self.embedded}
+
+
+_indexes: dict[str, ChunkIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def chunks_for(root: str, crab: str | None = None) -> ChunkIndex:
+    """The shared chunk index for a box (created on first use)."""
+    key = os.path.realpath(root)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = ChunkIndex(key, crab)
+        return idx
+
+
+def search_files(query: str, env_root: str, max_results: int = 5) -> str:
+    """The search_files tool: search what's indexed so far and format passages for the model."""
+    if not query.strip():
+        return "Error: empty query"
+    index = chunks_for(env_root)
+    results = index.search(query, top_k=max(1, min(int(max_results), 20)))
+    lines = [f"--- {r['path']} ---\n{r['text']}" for r in results]
+    if not lines:
+        lines.append("Nothing in your files matches that yet.")
+    if index.pending:
+        lines.append(f"({index.pending} recently changed files not indexed yet)")
+    return "\n\n".join(lines)
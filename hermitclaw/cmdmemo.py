@@ -0,0 +1,220 @@
+"""Memoized read-only shell commands — `ls`, `cat`, `grep`, ... answered again without a process."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shlex
+import stat
+import threading
+import time
+from collections import OrderedDict
+
+from hermitclaw.config import config
+
+logger = logging.getLogger("hermitclaw.cmdmemo")
+
+MAX_WALK = 2000  # entries a recursive command may cover and still be memoized
+RACY_NS = 2_000_000_000  # a path changed this recently may change again within the same timestamp
+
+_GLOB = set("*?[")
+# ls flags that only change which names are shown, or their order by name
+_LS_NAMES_ONLY = set("aA1CxmrdU")
+# find tests whose answer depends on the clock (or on a file we don't track)
+_FIND_CLOCK = {"-amin", "-atime", "-cmin", "-ctime", "-mmin", "-mtime", "-used",
+               "-newer", "-anewer", "-cnewer", "-newermt"}
+_GREP_RECURSIVE = {"-r", "-R", "--recursive", "--dereference-recursive"}
+
+
+def _split_flags(words: list[str]) -> tuple[set[str], list[str]]:
+    """Flags (short ones split into letters, as "-x") and the other words."""
+    flags, rest, done = set(), [], False
+    for w in words:
+        if done or not w.startswith("-") or w == "-":
+            rest.append(w)
+        elif w == "--":
+            done = True
+        elif w.startswith("--"):
+            flags.add(w.split("=", 1)[0])
+        else:
+            flags.update(f"-{c}" for c in w[1:])
+    return flags, rest
+
+
+def dependencies(command: str) -> list[tuple[str, str]] | None:
+    """What a read-only command's output depends on: [(path, how)], or None if we can't say.
+
+    `how` is "self" (the path's own metadata — a file's content, a directory's
+    names), "children" (also each entry's metadata, for `ls -l` and globs) or
+    "tree" (everything under it). Commands that could walk the whole box
+    (where the server's own state lives) or read the clock aren't memoized.
+    """
+    deps = []
+    for part in command.split("|"):
+        try:
+            words = shlex.split(part)
+        except ValueError:
+            return None
+        if not words:
+            return None
+        cmd, args = words[0], words[1:]
+        if any("{" in a or "}" in a for a in args):
+            return None  # brace expansion
+        if cmd == "stat":
+            return None  # shows access times, which reading changes
+        if cmd == "find":
+            paths = []
+            for a in args:
+                if a.startswith(("-", "(", "!")):
+                    break
+                paths.append(a)
+            if _FIND_CLOCK.intersection(args):
+                return None
+            ops, how, default = paths, "tree", ["."]
+        else:
+            flags, ops = _split_flags(args)
+            if cmd == "ls":
+                if "-u" in flags or "-c" in flags:
+                    return None
+                how = "tree" if "-R" in flags else (
+                    "self" if all(f[1:] in _LS_NAMES_ONLY for f in flags) else "children")
+                default = ["."]
+            elif cmd in ("du", "tree"):
+                how, default = "tree", ["."]
+            elif cmd == "grep":
+                if not {"-e", "-f", "--regexp", "--file"} & flags:
+                    ops = ops[1:]  # the pattern
+                how = "tree" if _GREP_RECURSIVE & flags else "self"
+                default = ["."] if how == "tree" else []  # plain grep reads stdin
+            elif cmd == "pwd":
+                continue
+            else:  # cat, head, tail, wc read their operands (or stdin)
+                how, default = "self", []
+        for op in ops or default:
+            path = os.path.normpath(op)
+            if os.path.isabs(path) or path.startswith(".."):
+                return None
+            head, tail = os.path.split(path)
+            if _GLOB & set(head):
+                return None
+            if _GLOB & set(tail):
+                # The glob is expanded from the directory's entries
+                path, dep_how = head or ".", "children" if how == "self" else how
+            else:
+                dep_how = how
+            if dep_how == "tree" and path == ".":
+                return None  # the whole box, .venv and .hermitclaw included
+            deps.append((path, dep_how))
+    return deps
+
+
+def _stat(path: str):
+    """The path's metadata, and for a symlink its target's too (commands read through it)."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    # ctime can't be set from userspace, so any write or chmod shows up here
+    meta = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    if stat.S_ISLNK(st.st_mode):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return meta + (None,)  # dangling
+        meta += (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    return meta
+
+
+def _changed_since(meta: tuple | None, ns: int) -> bool:
+    return meta is not None and any(ctime and ctime > ns for ctime in meta[3::4])
+
+
+def signature(root: str, deps: list[tuple[str, str]]) -> list | None:
+    """Current metadata of everything in `deps` (None if a tree is too big to track)."""
+    sig = []
+    for path, how in deps:
+        full = os.path.join(root, path)
+        sig.append((path, _stat(full)))
+        if how == "self" or not os.path.isdir(full):
+            continue
+        if how == "children":
+            try:
+                names = sorted(os.listdir(full))
+            except OSError:
+                continue
+            sig.extend((n, _stat(os.path.join(full, n))) for n in names)
+            continue
+        for dirpath, dirnames, filenames in os.walk(full):
+            dirnames.sort()
+            for name in sorted(dirnames + filenames):
+                sig.append((os.path.join(dirpath, name), _stat(os.path.join(dirpath, name))))
+            if len(sig) > MAX_WALK:
+                return None
+    return sig
+
+
+class CommandMemo:
+    """Outputs of read-only commands per box, valid while the files they read are unchanged.
+
+    Before a read-only command runs, `lookup()` works out which paths it reads
+    and stats them; if the same command was run against exactly that state, its
+    output is returned and no process is started. Anything that changes a path
+    (the crab's own commands, the brain, the user dropping files) changes its
+    ctime, so no write goes unnoticed; paths touched in the last couple of
+    seconds aren't memoized at all, since a second write could land within
+    the same timestamp.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._boxes: dict[str, OrderedDict[str, tuple[list, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0  # process launches avoided
+        self.misses = 0
+        self.uncacheable = 0
+
+    def lookup(self, root: str, command: str) -> tuple[str | None, tuple | None]:
+        """(memoized output or None, token to pass to store() after running it)."""
+        if not self.max_entries:
+            return None, None
+        deps = dependencies(command)
+        sig = signature(root, deps) if deps is not None else None
+        if sig is None:
+            self.uncacheable += 1
+            return None, None
+        with self._lock:
+            entries = self._boxes.get(root)
+            entry = entries.get(command) if entries else None
+            if entry is not None and entry[0] == sig:
+                entries.move_to_end(command)
+                self.hits += 1
+                return entry[1], None
+            self.misses += 1
+        racy = time.time_ns() - RACY_NS
+        if any(_changed_since(s, racy) for _, s in sig):
+            return None, None
+        return None, (command, sig)
+
+    def store(self, root: str, token: tuple, output: str):
+        """Remember `output` for the state the token was taken in."""
+        command, sig = token
+        with self._lock:
+            entries = self._boxes.setdefault(root, OrderedDict())
+            entries[command] = (sig, output)
+            entries.move_to_end(command)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def status(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": sum(len(e) for e in self._boxes.values()),
+                "launches_avoided": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+memo = CommandMemo(config["commands"]["memo_entries"])
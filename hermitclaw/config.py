@@ -15,6 +15,16 @@ def load_config() -> dict:
     config.setdefault("provider", "ollama")
     config.setdefault("ollama_base", "http://localhost:11434")
 
+    # Backend pool — several Ollama servers, comma-separated in the env var
+    backends = os.environ.get("HERMITCLAW_OLLAMA_BACKENDS")
+    if backends:
+        config["ollama_backends"] = [u.strip() for u in backends.split(",") if u.strip()]
+    config.setdefault("ollama_backends", [])
+    config.setdefault("ollama_routing", "least_outstanding")
+    config.setdefault("ollama_sticky", True)
+    config.setdefault("ollama_hedge_ms", 150)
+    config.setdefault("ollama_health_interval", 15)
+
     # Environment variable overrides
     config["api_key"] = (
         os.environ.get("OPENAI_API_KEY")
@@ -22,9 +32,104 @@ def load_config() -> dict:
     )
     config["model"] = os.environ.get("HERMITCLAW_MODEL") or config.get("model", "qwen2.5:14b")
 
+    # Per-call-type routing: think / importance / reflect / plan -> model, num_ctx, num_predict
+    config["routes"] = config.get("routes") or {}
+
+    # Response cache for short tool-free calls
+    llm_cache = config.get("llm_cache") or {}
+    llm_cache.setdefault("enabled", False)
+    llm_cache.setdefault("routes", ["importance", "reflect"])
+    llm_cache.setdefault("ttl_seconds", 86400)
+    llm_cache.setdefault("max_entries", 5000)
+    llm_cache.setdefault("path", ".cache/llm_responses.jsonl")
+    config["llm_cache"] = llm_cache
+
+    # Raw API call log: one rotated, compressed set of segments per crab
+    api_log = config.get("api_log") or {}
+    api_log.setdefault("dir", "api_logs")
+    api_log.setdefault("max_segment_mb", 64)
+    api_log.setdefault("max_segment_age_hours", 24)
+    api_log.setdefault("compress", "gzip")
+    config["api_log"] = api_log
+
+    # Adaptive pacing: scale thinking_pace_seconds by backend load
+    pacing = config.get("pacing") or {}
+    pacing.setdefault("enabled", True)
+    pacing.setdefault("target_utilization", 0.7)
+    pacing.setdefault("min_pause_seconds", 2)
+    pacing.setdefault("max_pause_seconds", 300)
+    pacing.setdefault("max_queue_per_backend", 2)
+    pacing.setdefault("max_thoughts_per_minute", 0)
+    pacing.setdefault("engaged_seconds", 120)
+    config["pacing"] = pacing
+
+    # Dropped-file ingestion: how much to extract, image size, extraction cache
+    ingest = config.get("ingest") or {}
+    ingest.setdefault("max_text_chars", 2000)
+    ingest.setdefault("max_pdf_chars", 4000)
+    ingest.setdefault("max_pdf_pages", 20)
+    ingest.setdefault("image_max_px", 1024)
+    ingest.setdefault("cache_path", ".cache/ingest.jsonl")
+    ingest.setdefault("cache_entries", 100)
+    config["ingest"] = ingest
+
+    # Chunked file search: what gets indexed, and how much is embedded per refresh
+    file_search = config.get("file_search") or {}
+    file_search.setdefault("enabled", True)
+    file_search.setdefault("chunk_chars", 800)
+    file_search.setdefault("max_file_kb", 256)
+    file_search.setdefault("max_pdf_pages", 50)
+    file_search.setdefault("max_chunks_per_refresh", 64)
+    file_search.setdefault("context_excerpts", 2)
+    config["file_search"] = file_search
+
+    # Shell commands: concurrency caps (all crabs / one crab), timeout, resource limits,
+    # how much output is kept, how many read-only outputs are memoized per box
+    commands = config.get("commands") or {}
+    commands.setdefault("max_concurrent", 4)
+    commands.setdefault("max_per_crab", 2)
+    commands.setdefault("timeout_seconds", 60)
+    commands.setdefault("cpu_seconds", 60)
+    commands.setdefault("memory_mb", 2048)
+    commands.setdefault("file_size_mb", 512)
+    commands.setdefault("capture_kb", 64)
+    commands.setdefault("memo_entries", 64)
+    config["commands"] = commands
+
+    # Warm sandboxed Python interpreters: how many per box, what they import up front
+    python_workers = config.get("python_workers") or {}
+    python_workers.setdefault("enabled", True)
+    python_workers.setdefault("per_box", 1)
+    python_workers.setdefault("preload", ["json", "csv", "math", "random", "re", "datetime",
+                                          "collections", "numpy", "pymupdf"])
+    config["python_workers"] = python_workers
+
+    # Web search: backend (ddgs, or an offline fixture) and the result cache shared by all crabs
+    web_search = config.get("web_search") or {}
+    web_search.setdefault("backend", "ddgs")
+    web_search.setdefault("fixture_path", "")
+    web_search.setdefault("cache_path", ".cache/web_search.jsonl")
+    web_search.setdefault("ttl_seconds", 21600)
+    web_search.setdefault("max_entries", 2000)
+    web_search.setdefault("shared", True)
+    config["web_search"] = web_search
+
+    # Crab venvs: cloned from one prebuilt template per interpreter; pip's cache is shared
+    venv = config.get("venv") or {}
+    venv.setdefault("template_dir", ".cache/venvs")
+    venv.setdefault("clone", "auto")
+    venv.setdefault("pip_cache_dir", ".cache/pip")
+    config["venv"] = venv
+
     # Defaults for numeric settings
     config.setdefault("thinking_pace_seconds", 30)
     config.setdefault("max_thoughts_in_context", 4)
+    config.setdefault("tool_workers", 8)
+    config.setdefault("events_buffer_size", 2000)
+    config.setdefault("api_calls_buffer_size", 200)
+    config.setdefault("ws_queue_size", 256)
+    config.setdefault("resume_window_seconds", 1800)
+    config.setdefault("reply_window_seconds", 45)
     config.setdefault("environment_path", "./environment")
     config.setdefault("reflection_threshold", 50)
     config.setdefault("memory_retrieval_count", 3)
@@ -35,6 +140,19 @@ def load_config() -> dict:
     project_root = os.path.dirname(os.path.dirname(__file__))
     if not os.path.isabs(config["environment_path"]):
         config["environment_path"] = os.path.join(project_root, config["environment_path"])
+    if not os.path.isabs(api_log["dir"]):
+        api_log["dir"] = os.path.join(project_root, api_log["dir"])
+    if not os.path.isabs(llm_cache["path"]):
+        llm_cache["path"] = os.path.join(project_root, llm_cache["path"])
+    if ingest["cache_path"] and not os.path.isabs(ingest["cache_path"]):
+        ingest["cache_path"] = os.path.join(project_root, ingest["cache_path"])
+
+    for key in ("cache_path", "fixture_path"):
+        if web_search[key] and not os.path.isabs(web_search[key]):
+            web_search[key] = os.path.join(project_root, web_search[key])
+    for key in ("template_dir", "pip_cache_dir"):
+        if venv[key] and not os.path.isabs(venv[key]):
+            venv[key] = os.path.join(project_root, venv[key])
 
     return config
 
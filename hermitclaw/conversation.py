@@ -0,0 +1,82 @@
+"""Conversation inbox/outbox — the crab keeps thinking while it waits for you to answer."""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+
+from hermitclaw.stats import LatencyStats
+
+
+class Conversation:
+    """Messages from the owner, queued until the crab's next thought, and what it said back.
+
+    Nothing here blocks: the crab speaks with `said()` and carries on; whatever
+    the owner sends meanwhile waits in the inbox and is handed over with
+    `take()` on a later cycle. A message sent within `reply_window` seconds of
+    the crab speaking counts as a reply.
+
+    Latency is measured from a message arriving to the crab seeing it
+    (`wait`) and to the crab answering it with the respond tool (`response`).
+    """
+
+    def __init__(self, max_pending: int = 20, reply_window: float = 45):
+        self.reply_window = reply_window
+        self._inbox: deque[dict] = deque(maxlen=max_pending)  # {"text", "at", "reply"}
+        self.outbox: deque[dict] = deque(maxlen=50)  # {"text", "at"}
+        self.awaiting_since: float | None = None  # when the crab last spoke, until answered
+        # Arrival times of messages seen but not yet answered; if the crab never
+        # answers, only the newest are kept (the rest are never timed)
+        self._unanswered: deque[float] = deque(maxlen=max_pending)
+        self.wait_stats = LatencyStats()
+        self.response_stats = LatencyStats()
+        self.received = 0
+        self.dropped = 0
+
+    def awaiting(self) -> bool:
+        """The crab spoke recently and hasn't been answered."""
+        return (self.awaiting_since is not None
+                and time.time() - self.awaiting_since < self.reply_window)
+
+    def receive(self, text: str, at: float | None = None) -> dict:
+        """Queue a message from the owner."""
+        if len(self._inbox) == self._inbox.maxlen:
+            self.dropped += 1  # oldest goes
+        msg = {"text": text, "at": at or time.time(), "reply": self.awaiting()}
+        self._inbox.append(msg)
+        self.received += 1
+        if msg["reply"]:
+            self.awaiting_since = None
+        return msg
+
+    def pending(self) -> list[dict]:
+        return list(self._inbox)
+
+    def take(self) -> list[dict]:
+        """Hand every queued message to the crab (oldest first)."""
+        msgs = list(self._inbox)
+        self._inbox.clear()
+        now = time.time()
+        for m in msgs:
+            self.wait_stats.record(now - m["at"])
+            self._unanswered.append(m["at"])
+        return msgs
+
+    def said(self, text: str):
+        """The crab spoke to the owner."""
+        now = time.time()
+        for at in self._unanswered:
+            self.response_stats.record(now - at)
+        self._unanswered.clear()
+        self.awaiting_since = now
+        self.outbox.append({"text": text, "at": now})
+
+    def status(self) -> dict:
+        return {
+            "pending": len(self._inbox),
+            "awaiting_reply": self.awaiting(),
+            "received": self.received,
+            "dropped": self.dropped,
+            "wait": self.wait_stats.summary(),
+            "response": self.response_stats.summary(),
+        }
@@ -0,0 +1,220 @@
+"""Bounded in-memory history that spills older entries to an indexed log on disk."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+from collections import deque
+
+from hermitclaw.calllog import background_writer
+
+logger = logging.getLogger("hermitclaw.eventlog")
+
+_OFFSET = struct.Struct("<Q")  # one 8-byte file offset per entry in the .idx sidecar
+
+
+class IndexedLog:
+    """Append-only JSONL file plus an `.idx` sidecar holding each line's byte offset.
+
+    Entry N's offset is slot N of the index, so reading any range is one seek.
+    `write()` only queues the entry; the shared background writer (calllog.py)
+    appends it in a batch, so callers on the event loop never wait on the disk.
+    Data is written before the offsets that point at it, and whatever a crash
+    left half-written is cut off when the log is opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.idx_path = path + ".idx"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            self._repair()
+        except OSError as e:
+            logger.error(f"Failed to check {path}: {e}")
+
+    def _repair(self):
+        """Make the index and the data agree: every slot points at a whole line, and
+        nothing follows the last one (later appends must land right after it)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as data, open(self.idx_path, "a+b") as idx:
+            size = os.fstat(data.fileno()).st_size
+            n = os.fstat(idx.fileno()).st_size // _OFFSET.size
+            end = 0
+            if not n and size:
+                # No index at all (lost before its first slot was written): rebuild it
+                offsets = []
+                for line in data:
+                    if not line.endswith(b"\n"):
+                        break
+                    offsets.append(end)
+                    end += len(line)
+                idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+                n = len(offsets)
+            while n and not end:
+                idx.seek((n - 1) * _OFFSET.size)
+                (offset,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+                if offset < size:
+                    data.seek(offset)
+                    line = data.readline()
+                    if line.endswith(b"\n"):
+                        end = offset + len(line)
+                        break
+                n -= 1  # its line never made it to disk, or only part of it
+            idx.truncate(n * _OFFSET.size)
+        if end != size:
+            logger.warning(f"{self.path}: dropped a partly written tail ({size - end} bytes)")
+            os.truncate(self.path, end)
+
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self.idx_path) // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, entries: list[dict]):
+        offsets, idx_end = [], None
+        try:
+            with open(self.path, "ab") as data:
+                for entry in entries:
+                    offsets.append(data.tell())
+                    data.write((json.dumps(entry) + "\n").encode())
+            # Only once the lines are written: an offset never points past the data
+            with open(self.idx_path, "ab") as idx:
+                idx_end = idx.tell()
+                idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+        except BaseException:
+            # e.g. out of space: take back the half-written batch from both files
+            if offsets:
+                os.truncate(self.path, offsets[0])
+            if idx_end is not None:
+                os.truncate(self.idx_path, idx_end)
+            raise
+
+    def write(self, entry: dict):
+        background_writer().put(self, entry)
+
+    def flush(self, timeout: float = 10):
+        """Block until everything queued so far is on disk."""
+        background_writer().flush(timeout)
+
+    # The background writer hands batches back here
+    _write_batch = append
+
+    # As a spill-only SpillBuffer store, evicted entries are simply appended
+    spill = append
+
+    def __repr__(self) -> str:
+        return f"IndexedLog({self.path})"
+
+    def read(self, start: int, end: int) -> list[dict]:
+        """Entries start..end-1."""
+        out = []
+        if start >= end:
+            return out
+        with open(self.idx_path, "rb") as idx, open(self.path, "rb") as data:
+            idx.seek(start * _OFFSET.size)
+            raw = idx.read((end - start) * _OFFSET.size)
+            offsets = [o for (o,) in _OFFSET.iter_unpack(raw)]
+            if offsets:
+                data.seek(offsets[0])
+                for _ in offsets:
+                    line = data.readline()
+                    if not line:
+                        break
+                    out.append(json.loads(line))
+        return out
+
+
+class SpillBuffer:
+    """Ring buffer of the newest `maxlen` entries; older ones live in a backing store.
+
+    Every entry gets a sequence number (`seq`). The store needs `count()`,
+    `read(start, end)` and either `spill(entries)` (evicted entries are handed
+    over) or, with `write_through`, `write(entry)` (every entry is written as
+    it arrives). A write-through buffer starts with the newest `maxlen` entries
+    already in the store, so history survives a restart; only that tail is read.
+    """
+
+    def __init__(self, store, maxlen: int, write_through: bool = False):
+        self.store = store
+        self.maxlen = maxlen
+        self.write_through = write_through
+        self._mem: deque[dict] = deque()
+        self._lock = threading.Lock()
+        # Entries in the store that aren't in memory == seq of the first in-memory entry
+        self._spilled = store.count() if store else 0
+        if store and write_through and self._spilled:
+            self._restore()
+
+    def _restore(self):
+        start = max(0, self._spilled - self.maxlen)
+        try:
+            tail = self.store.read(start, self._spilled)
+        except Exception as e:
+            logger.error(f"Failed to restore history: {e}")
+            return
+        self._mem.extend(tail)
+        self._spilled -= len(tail)
+
+    # --- Writing ---
+
+    def append(self, entry: dict):
+        with self._lock:
+            entry["seq"] = self._spilled + len(self._mem)
+            self._mem.append(entry)
+            if self.store and self.write_through:
+                try:
+                    self.store.write(entry)
+                except Exception as e:
+                    logger.error(f"Failed to write history: {e}")
+            overflow = []
+            while len(self._mem) > self.maxlen:
+                overflow.append(self._mem.popleft())
+            if overflow:
+                self._spill(overflow)
+
+    def _spill(self, entries: list[dict]):
+        """Move entries out of memory. Caller holds the lock."""
+        if self.store and not self.write_through:
+            try:
+                self.store.spill(entries)
+            except Exception as e:
+                logger.error(f"Failed to spill history: {e}")
+        self._spilled += len(entries)
+
+    # --- Reading ---
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._mem))
+
+    def __reversed__(self):
+        with self._lock:
+            return reversed(list(self._mem))
+
+    def __len__(self) -> int:
+        """Total entries ever appended (in memory and on disk)."""
+        return self._spilled + len(self._mem)
+
+    def recent(self, limit: int) -> list[dict]:
+        return self.page(None, limit)
+
+    def page(self, before: int | None, limit: int) -> list[dict]:
+        """Up to `limit` entries with seq < `before` (default: newest), oldest first."""
+        with self._lock:
+            end = len(self) if before is None else min(before, len(self))
+            start = max(0, end - max(0, limit))
+            mem = [e for e in self._mem if start <= e["seq"] < end]
+            disk_end = min(end, self._spilled)
+        disk = []
+        if self.store and start < disk_end:
+            try:
+                disk = self.store.read(start, disk_end)
+            except Exception as e:
+                logger.error(f"Failed to read history: {e}")
+        return disk + mem
+
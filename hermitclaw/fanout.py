@@ -0,0 +1,121 @@
+"""WebSocket fan-out — serialize once, one bounded send queue per viewer."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import deque
+
+logger = logging.getLogger("hermitclaw.fanout")
+
+# Only the newest of these matters; a lagging viewer gets the latest, not the backlog
+COALESCE = {"position", "status", "activity"}
+
+# Close code for viewers that can't keep up (RFC 6455 "try again later")
+CLOSE_TOO_SLOW = 1013
+
+
+class _Viewer:
+    """One connected socket: its pending messages and the task that sends them."""
+
+    def __init__(self, ws, max_queue: int):
+        self.ws = ws
+        self.max_queue = max_queue
+        self._queue: deque[list] = deque()  # [event, text] pairs, oldest first
+        self._pending: dict[str, list] = {}  # coalescable event -> its slot in the queue
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.task: asyncio.Task | None = None
+
+    def offer(self, event: str, text: str) -> bool:
+        """Queue a message. False if the viewer has fallen too far behind."""
+        slot = self._pending.get(event)
+        if slot is not None:
+            slot[1] = text  # replace the stale one in place
+            self.coalesced += 1
+            return True
+        if len(self._queue) >= self.max_queue:
+            return False
+        slot = [event, text]
+        self._queue.append(slot)
+        if event in COALESCE:
+            self._pending[event] = slot
+        self._ready.set()
+        return True
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._queue:
+                slot = self._queue.popleft()
+                if self._pending.get(slot[0]) is slot:
+                    del self._pending[slot[0]]
+                await self.ws.send_text(slot[1])
+                self.sent += 1
+
+
+class Fanout:
+    """Broadcasts to every viewer without ever waiting on any one of them.
+
+    `broadcast()` serializes the message once and drops it into each viewer's
+    queue; a per-viewer task does the actual sends. Viewers whose queue fills
+    up are disconnected rather than allowed to hold memory or stall the crab.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._viewers: dict[object, _Viewer] = {}
+        self.dropped_viewers = 0
+
+    def add(self, ws):
+        viewer = _Viewer(ws, self.max_queue)
+        viewer.task = asyncio.ensure_future(self._serve(viewer))
+        self._viewers[ws] = viewer
+
+    def remove(self, ws):
+        viewer = self._viewers.pop(ws, None)
+        if viewer and viewer.task and viewer.task is not asyncio.current_task():
+            viewer.task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._viewers)
+
+    def broadcast(self, message: dict):
+        if not self._viewers:
+            return
+        event = message.get("event", "")
+        text = json.dumps(message)
+        for ws, viewer in list(self._viewers.items()):
+            if not viewer.offer(event, text):
+                logger.warning(f"Dropping WebSocket viewer: {len(viewer._queue)} messages behind")
+                self.dropped_viewers += 1
+                self.remove(ws)
+                asyncio.ensure_future(_close(ws, CLOSE_TOO_SLOW))
+
+    async def _serve(self, viewer: _Viewer):
+        try:
+            await viewer.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.remove(viewer.ws)  # socket went away mid-send
+
+    def stats(self) -> dict:
+        viewers = list(self._viewers.values())
+        return {
+            "viewers": len(viewers),
+            "queued": sum(len(v._queue) for v in viewers),
+            "max_queued": max((len(v._queue) for v in viewers), default=0),
+            "coalesced": sum(v.coalesced for v in viewers),
+            "dropped_viewers": self.dropped_viewers,
+        }
+
+
+async def _close(ws, code: int):
+    try:
+        await ws.close(code=code)
+    except Exception:
+        pass
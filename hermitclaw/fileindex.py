@@ -0,0 +1,348 @@
+"""Incremental index of the files in a crab's box — inotify on Linux, directory mtimes elsewhere."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("hermitclaw.fileindex")
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE
+               | IN_MODIFY | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")
+
+
+def _hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+class _Inotify:
+    """Thin ctypes wrapper around the inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._rm(self.fd, wd)
+
+    def read_events(self):
+        """Yield (wd, mask, name) for everything queued right now."""
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+                pos += _EVENT.size
+                name = buf[pos:pos + length].rstrip(b"\0").decode(errors="surrogateescape")
+                pos += length
+                yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileIndex:
+    """The set of non-hidden files under `root`, kept current without re-walking the tree.
+
+    With inotify, `refresh()` just drains queued events. Without it (or when the
+    watch limit runs out), it stats each known directory and re-lists only the
+    ones whose mtime changed. Hidden files and directories (.venv, .cache, ...)
+    are never indexed.
+
+    Changes are attributed: anything added while a `crab_activity()` block is
+    open counts as the crab's, everything else as the user's.
+    """
+
+    def __init__(self, root: str, use_inotify: bool = True):
+        self.root = os.path.realpath(root)
+        self.generation: int = 0  # bumped on every observed change
+        self.changes: deque[tuple[str, str, str]] = deque(maxlen=1000)  # (op, path, source)
+        self._files: set[str] = set()
+        self._lock = threading.RLock()
+        self._crab_depth = 0
+        self._crab_added: set[str] = set()
+        # Inotify state
+        self._ino: _Inotify | None = None
+        self._wd_to_dir: dict[int, str] = {}
+        self._dir_to_wd: dict[str, int] = {}
+        # Polling state: dir -> (mtime_ns, files, subdirs)
+        self._dirs: dict[str, tuple[int, set[str], set[str]]] = {}
+
+        if use_inotify:
+            try:
+                self._ino = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify unavailable ({e}); polling {self.root}")
+        self._rebuild()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._ino else "poll"
+
+    # --- Public API ---
+
+    def files(self) -> set[str]:
+        """All indexed files (relative paths). Refreshes first."""
+        with self._lock:
+            self.refresh()
+            return set(self._files)
+
+    def refresh(self):
+        with self._lock:
+            if self._ino:
+                self._drain_inotify()
+            else:
+                self._poll()
+
+    @contextmanager
+    def crab_activity(self):
+        """Attribute changes made inside this block to the crab."""
+        with self._lock:
+            self.refresh()  # anything before this was the user's
+            self._crab_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.refresh()
+                self._crab_depth -= 1
+
+    def take_crab_added(self) -> set[str]:
+        """Files the crab created since the last call."""
+        with self._lock:
+            added, self._crab_added = self._crab_added, set()
+            return added
+
+    def close(self):
+        with self._lock:
+            if self._ino:
+                self._ino.close()
+                self._ino = None
+
+    # --- Bookkeeping ---
+
+    def _source(self) -> str:
+        return "crab" if self._crab_depth else "user"
+
+    def _added(self, rel: str):
+        if rel in self._files:
+            return
+        self._files.add(rel)
+        self.generation += 1
+        source = self._source()
+        self.changes.append(("added", rel, source))
+        if source == "crab":
+            self._crab_added.add(rel)
+
+    def _removed(self, rel: str):
+        if rel not in self._files:
+            return
+        self._files.discard(rel)
+        self.generation += 1
+        self._crab_added.discard(rel)
+        self.changes.append(("removed", rel, self._source()))
+
+    def _remove_prefix(self, rel_dir: str):
+        prefix = rel_dir + os.sep
+        for rel in [f for f in self._files if f.startswith(prefix)]:
+            self._removed(rel)
+
+    def _rel(self, path: str) -> str:
+        rel = os.path.relpath(path, self.root)
+        return "" if rel == "." else rel
+
+    def _rebuild(self):
+        """Full scan — on startup and after an inotify queue overflow."""
+        old = set(self._files)
+        for wd in list(self._wd_to_dir):
+            if self._ino:
+                self._ino.rm_watch(wd)
+        self._wd_to_dir.clear()
+        self._dir_to_wd.clear()
+        self._dirs.clear()
+        self._files = set()
+        self._scan_dir("", initial=True)
+        if old and old != self._files:
+            self.generation += 1
+
+    def _scan_dir(self, rel_dir: str, initial: bool = False):
+        """Index a directory and everything under it (adding watches as we go)."""
+        full = os.path.join(self.root, rel_dir)
+        if self._ino:
+            try:
+                wd = self._ino.add_watch(full)
+                self._wd_to_dir[wd] = rel_dir
+                self._dir_to_wd[rel_dir] = wd
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    logger.warning(f"Out of inotify watches; polling {self.root}")
+                    self._ino.close()
+                    self._ino = None
+                    self._rebuild()
+                    return
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    raise
+                return
+        try:
+            st = os.stat(full)
+            entries = list(os.scandir(full))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+        files, subdirs = set(), set()
+        for entry in entries:
+            if _hidden(entry.name):
+                continue
+            rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                subdirs.add(entry.name)
+            else:
+                files.add(entry.name)
+                if initial:
+                    self._files.add(rel)
+                else:
+                    self._added(rel)
+        self._dirs[rel_dir] = (st.st_mtime_ns, files, subdirs)
+        for name in subdirs:
+            self._scan_dir(os.path.join(rel_dir, name) if rel_dir else name, initial)
+
+    # --- Inotify ---
+
+    def _drop_watches(self, rel_dir: str):
+        prefix = rel_dir + os.sep
+        for d in [d for d in self._dir_to_wd if d == rel_dir or d.startswith(prefix)]:
+            wd = self._dir_to_wd.pop(d)
+            self._wd_to_dir.pop(wd, None)
+            self._ino.rm_watch(wd)
+        for d in [d for d in self._dirs if d == rel_dir or d.startswith(prefix)]:
+            del self._dirs[d]
+
+    def _drain_inotify(self):
+        for wd, mask, name in self._ino.read_events():
+            if mask & IN_Q_OVERFLOW:
+                logger.warning(f"inotify queue overflowed for {self.root}; rescanning")
+                self._rebuild()
+                return
+            if mask & IN_IGNORED:
+                d = self._wd_to_dir.pop(wd, None)
+                if d is not None and self._dir_to_wd.get(d) == wd:
+                    del self._dir_to_wd[d]
+                continue
+            rel_dir = self._wd_to_dir.get(wd)
+            if rel_dir is None or not name or _hidden(name):
+                continue
+            rel = os.path.join(rel_dir, name) if rel_dir else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._scan_dir(rel)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_watches(rel)
+                    self._remove_prefix(rel)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self._added(rel)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._removed(rel)
+            elif mask & (IN_CLOSE_WRITE | IN_MODIFY):
+                self.generation += 1
+
+    # --- Polling fallback ---
+
+    def _poll(self):
+        for rel_dir in sorted(self._dirs):
+            if rel_dir not in self._dirs:
+                continue  # dropped with its parent this pass
+            mtime, files, subdirs = self._dirs[rel_dir]
+            full = os.path.join(self.root, rel_dir)
+            try:
+                st = os.stat(full)
+            except (FileNotFoundError, NotADirectoryError):
+                self._forget_dir(rel_dir)
+                continue
+            if st.st_mtime_ns == mtime:
+                continue
+            try:
+                entries = list(os.scandir(full))
+            except (FileNotFoundError, NotADirectoryError):
+                self._forget_dir(rel_dir)
+                continue
+            new_files, new_subdirs = set(), set()
+            for entry in entries:
+                if _hidden(entry.name):
+                    continue
+                try:
+                    (new_subdirs if entry.is_dir(follow_symlinks=False) else new_files).add(entry.name)
+                except OSError:
+                    continue
+            join = (lambda n: os.path.join(rel_dir, n)) if rel_dir else (lambda n: n)
+            for name in files - new_files:
+                self._removed(join(name))
+            for name in new_files - files:
+                self._added(join(name))
+            for name in subdirs - new_subdirs:
+                self._forget_dir(join(name))
+            self._dirs[rel_dir] = (st.st_mtime_ns, new_files, new_subdirs)
+            for name in new_subdirs - subdirs:
+                self._scan_dir(join(name))
+
+    def _forget_dir(self, rel_dir: str):
+        prefix = rel_dir + os.sep
+        for d in [d for d in self._dirs if d == rel_dir or d.startswith(prefix)]:
+            del self._dirs[d]
+        self._remove_prefix(rel_dir)
+
+
+_indexes: dict[str, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_for(root: str) -> FileIndex:
+    """The shared index for a box (created on first use)."""
+    key = os.path.realpath(root)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = FileIndex(key)
+        return idx
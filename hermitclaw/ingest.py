@@ -0,0 +1,151 @@
+"""Dropped-file ingestion — bounded extraction, downsized images, cached by content hash.
+
+Turns a file the owner dropped into the box into what the crab's inbox alert
+shows: a text excerpt or a small image. Extraction stops as soon as there's
+enough (a page budget for PDFs, a byte budget for text), images are shrunk
+before they are base64'd into the prompt, and results are cached by the
+file's SHA-256 so re-dropping or renaming a file is free. Everything here is
+blocking; the brain runs it in a worker thread.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import os
+
+from hermitclaw.cache import DiskCache
+from hermitclaw.config import config
+
+logger = logging.getLogger("hermitclaw.ingest")
+
+TEXT_EXTS = {".txt", ".md", ".py", ".json", ".csv", ".yaml", ".yml",
+             ".toml", ".js", ".ts", ".html", ".css", ".sh", ".log"}
+PDF_EXTS = {".pdf"}
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+_MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+         ".gif": "image/gif", ".webp": "image/webp"}
+
+# Images we can't re-encode are passed through only if they're already this small
+RAW_IMAGE_MAX_BYTES = 512 * 1024
+
+_cfg = config["ingest"]
+_cache = DiskCache(_cfg["cache_path"], ttl=30 * 86400, max_entries=_cfg["cache_entries"]) \
+    if _cfg["cache_path"] else None
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def ingest_file(path: str, rel_path: str) -> dict:
+    """Inbox entry for one dropped file: {"name", "content", "image"}."""
+    ext = os.path.splitext(rel_path)[1].lower()
+    key = None
+    if _cache:
+        try:
+            # Limits are part of the key so changing them re-extracts
+            key = f"{file_hash(path)}|{ext}|{_cfg['max_text_chars']}|{_cfg['max_pdf_chars']}" \
+                  f"|{_cfg['max_pdf_pages']}|{_cfg['image_max_px']}"
+            cached = _cache.get(key)
+            if cached is not None:
+                return {"name": rel_path, **cached}
+        except OSError:
+            pass
+
+    result = _extract(path, rel_path, ext)
+    if key:
+        _cache.put(key, result)
+    return {"name": rel_path, **result}
+
+
+def _extract(path: str, rel_path: str, ext: str) -> dict:
+    if ext in PDF_EXTS:
+        return {"content": _pdf_text(path), "image": None}
+    if ext in TEXT_EXTS:
+        return {"content": _text_head(path), "image": None}
+    if ext in IMAGE_EXTS:
+        image = _image_data_url(path, ext)
+        if image:
+            return {"content": "", "image": image}
+        return {"content": "(could not read image)", "image": None}
+    return {"content": f"(binary file: {rel_path})", "image": None}
+
+
+def _text_head(path: str) -> str:
+    limit = _cfg["max_text_chars"]
+    try:
+        # 4 bytes per char covers any UTF-8; never read the rest of a huge file
+        with open(path, "rb") as f:
+            raw = f.read(limit * 4)
+        return raw.decode("utf-8", errors="replace")[:limit]
+    except Exception:
+        return "(could not read file)"
+
+
+def _pdf_text(path: str) -> str:
+    limit, max_pages = _cfg["max_pdf_chars"], _cfg["max_pdf_pages"]
+    try:
+        import pymupdf
+    except ImportError:
+        return "(install pymupdf to read PDFs: pip install pymupdf)"
+    try:
+        doc = pymupdf.open(path)
+    except Exception:
+        return "(could not read PDF)"
+    try:
+        pages, total, read = [], 0, 0
+        for page in doc:
+            if read >= max_pages or total >= limit:
+                break
+            text = page.get_text()
+            pages.append(text)
+            total += len(text)
+            read += 1
+        text = "\n\n".join(pages)
+        if not text.strip():
+            return "(PDF has no extractable text)"
+        excerpt = text[:limit]
+        if read < doc.page_count:
+            excerpt += f"\n\n[... {doc.page_count - read} more pages not shown]"
+        return excerpt
+    except Exception:
+        return "(could not read PDF)"
+    finally:
+        doc.close()
+
+
+def _image_data_url(path: str, ext: str) -> str | None:
+    """JPEG no larger than image_max_px on its long side, or the original if we can't decode it."""
+    max_px = _cfg["image_max_px"]
+    try:
+        import pymupdf
+        pix = pymupdf.Pixmap(path)
+        if pix.alpha or pix.n > 3:
+            pix = pymupdf.Pixmap(pymupdf.csRGB, pix) if pix.n - pix.alpha > 3 else pymupdf.Pixmap(pix, 0)
+        while max(pix.width, pix.height) > max_px:
+            pix.shrink(1)  # halves each side
+        data = pix.tobytes("jpg", jpg_quality=85)
+        return f"data:image/jpeg;base64,{base64.b64encode(data).decode()}"
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.info(f"Could not re-encode {path}: {e}")
+    try:
+        if os.path.getsize(path) > RAW_IMAGE_MAX_BYTES:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        return f"data:{_MIME.get(ext, 'image/png')};base64,{base64.b64encode(data).decode()}"
+    except Exception:
+        return None
+
+
+def cache_stats() -> dict | None:
+    return _cache.stats() if _cache else None
@@ -7,6 +7,7 @@ import logging
 import math
 import os
 import re
+import threading
 from datetime import datetime
 
 from hermitclaw.config import config
@@ -32,11 +33,13 @@ def _cosine_sim(a: list[float], b: list[float]) -> float:
 class MemoryStream:
     """Append-only memory stream with recency × importance × relevance retrieval."""
 
-    def __init__(self, environment_path: str):
+    def __init__(self, environment_path: str, crab: str | None = None):
         self.path = os.path.join(environment_path, STREAM_FILENAME)
+        self.crab = crab  # routes this crab's embeddings/scoring to its backend
         self.memories: list[dict] = []
         self.importance_sum: float = 0.0  # running sum since last reflection
         self._next_id: int = 0
+        self._lock = threading.Lock()  # add() runs from several threads (thoughts, reflections)
         self._load()
 
     def _load(self):
@@ -64,18 +67,22 @@ class MemoryStream:
     def add(self, content: str, kind: str = "thought", depth: int = 0,
             references=None) -> dict:
         """Score importance, compute embedding, append to stream."""
+        return self.commit(self.prepare(content, kind, depth, references))
+
+    def prepare(self, content: str, kind: str = "thought", depth: int = 0,
+                references=None) -> dict:
+        """The slow half of add(): score importance and embed. Nothing is stored yet."""
         # Score importance via LLM
         importance = self._score_importance(content)
 
         # Compute embedding
         try:
-            embedding = embed(content)
+            embedding = embed(content, crab=self.crab)
         except Exception as e:
             logger.error(f"Embedding failed: {e}")
             embedding = []
 
-        entry = {
-            "id": f"m_{self._next_id:04d}",
+        return {
             "timestamp": datetime.now().isoformat(),
             "kind": kind,
             "content": content,
@@ -85,22 +92,30 @@ class MemoryStream:
             "embedding": embedding,
         }
 
-        self.memories.append(entry)
-        self._next_id += 1
-        self.importance_sum += importance
+    def commit(self, entry: dict) -> dict:
+        """The fast half of add(): assign an ID, append to the stream and the file."""
+        with self._lock:
+            entry = {"id": f"m_{self._next_id:04d}", **entry}
+            self.memories.append(entry)
+            self._next_id += 1
+            self.importance_sum += entry["importance"]
 
-        # Append to JSONL file
-        try:
-            with open(self.path, "a") as f:
-                f.write(json.dumps(entry) + "\n")
-        except Exception as e:
-            logger.error(f"Failed to write memory: {e}")
+            # Append to JSONL file
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except Exception as e:
+                logger.error(f"Failed to write memory: {e}")
 
-        logger.info(f"Memory {entry['id']}: importance={importance}, kind={kind}")
+        logger.info(f"Memory {entry['id']}: importance={entry['importance']}, kind={entry['kind']}")
         return entry
 
-    def retrieve(self, query: str, top_k: int = None) -> list[dict]:
-        """Three-factor retrieval: recency × importance × relevance."""
+    def retrieve(self, query: str, top_k: int = None,
+                 query_embedding: list[float] | None = None) -> list[dict]:
+        """Three-factor retrieval: recency × importance × relevance.
+
+        Pass `query_embedding` if the query was already embedded (e.g. for a file search too).
+        """
         if top_k is None:
             top_k = config.get("memory_retrieval_count", 3)
 
@@ -108,11 +123,12 @@ class MemoryStream:
             return []
 
         # Embed the query
-        try:
-            query_embedding = embed(query)
-        except Exception as e:
-            logger.error(f"Query embedding failed: {e}")
-            return self.memories[-top_k:]  # fallback to recent
+        if query_embedding is None:
+            try:
+                query_embedding = embed(query, crab=self.crab)
+            except Exception as e:
+                logger.error(f"Query embedding failed: {e}")
+                return self.memories[-top_k:]  # fallback to recent
 
         decay_rate = config.get("recency_decay_rate", 0.995)
         now = datetime.now()
@@ -149,7 +165,13 @@ class MemoryStream:
 
     def reset_importance_sum(self):
         """Reset after a reflection cycle."""
-        self.importance_sum = 0.0
+        with self._lock:
+            self.importance_sum = 0.0
+
+    def consume_importance(self, amount: float):
+        """Take off what a reflection covered, keeping what arrived while it ran."""
+        with self._lock:
+            self.importance_sum = max(0.0, self.importance_sum - amount)
 
     def get_recent(self, n: int = 10, kind: str | None = None) -> list[dict]:
         """Get the last N memories, optionally filtered by kind."""
@@ -164,6 +186,8 @@ class MemoryStream:
             result = chat_short(
                 [{"role": "user", "content": content}],
                 instructions=IMPORTANCE_PROMPT,
+                crab=self.crab,
+                route="importance",
             )
             # Extract the first integer from the response
             match = re.search(r'\d+', result)
@@ -0,0 +1,384 @@
+"""Deterministic stand-in for Ollama — for load and latency testing without a model.
+
+Serves /api/chat (with tool calls and streaming), /api/embed and /api/tags.
+Answers are seeded-random (the same request always gets the same answer) or
+scripted from a JSON file, and every request sleeps for a delay drawn from a
+configurable latency distribution.
+
+    python -m hermitclaw.mockollama serve --port 11435 --latency lognormal:800,0.4
+    python -m hermitclaw.mockollama bench --crabs 20 --duration 60
+
+Latency specs (milliseconds): fixed:MS, uniform:LO,HI, normal:MEAN,SD,
+lognormal:MEDIAN,SIGMA, exp:MEAN.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("hermitclaw.mockollama")
+
+_WORDS = (
+    "tide pool shell current moss lichen spiral fractal signal pattern archive note "
+    "research question idea garden lantern window desk sketch theory orbit ember "
+    "river salt coral mycelium network echo mirror thread weave quiet drift"
+).split()
+
+# Tool calls the seeded-random mode can make — all harmless inside a box
+_RANDOM_TOOLS = [
+    ("shell", {"command": "ls"}),
+    ("shell", {"command": "cat projects.md"}),
+    ("shell", {"command": "mkdir -p notes"}),
+    ("shell", {"command": "echo '{words}' > notes/{word}.md"}),
+    ("shell", {"command": "grep -ri {word} notes"}),
+    ("search_files", {"query": "{word}"}),
+    ("web_search", {"query": "{word} {word2}"}),
+    ("move", {"location": "{location}"}),
+]
+_LOCATIONS = ["desk", "bookshelf", "window", "plant", "bed", "rug", "center"]
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a function rng -> seconds."""
+    kind, _, args = spec.partition(":")
+    nums = [float(x) for x in args.split(",") if x.strip()] if args else []
+    if kind == "fixed":
+        ms = nums[0] if nums else 0.0
+        return lambda rng: ms / 1000.0
+    if kind == "uniform":
+        lo, hi = nums
+        return lambda rng: rng.uniform(lo, hi) / 1000.0
+    if kind == "normal":
+        mean, sd = nums
+        return lambda rng: max(0.0, rng.gauss(mean, sd)) / 1000.0
+    if kind == "lognormal":
+        median, sigma = nums
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000.0
+    if kind == "exp":
+        mean = nums[0]
+        return lambda rng: rng.expovariate(1.0 / mean) / 1000.0
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class MockOllama:
+    """Request handling state shared by the server threads."""
+
+    def __init__(self, seed: int = 0, latency: str = "fixed:0", embed_latency: str = "fixed:0",
+                 tool_rate: float = 0.4, script: list[dict] | None = None, dim: int = 768):
+        self.seed = seed
+        self.latency = parse_latency(latency)
+        self.embed_latency = parse_latency(embed_latency)
+        self.tool_rate = tool_rate
+        self.script = script or []
+        self.dim = dim
+        self._script_pos = 0
+        self._lock = threading.Lock()
+        self.counts: dict[str, int] = {}
+
+    def _rng(self, body: bytes) -> random.Random:
+        # Seeded by request content so answers don't depend on arrival order
+        return random.Random(f"{self.seed}:{hashlib.sha256(body).hexdigest()}")
+
+    def _count(self, path: str):
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+    def _next_scripted(self) -> dict:
+        with self._lock:
+            item = self.script[self._script_pos % len(self.script)]
+            self._script_pos += 1
+        return item
+
+    def _random_reply(self, rng: random.Random, payload: dict) -> dict:
+        messages = payload.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        if "only a number" in system.lower():
+            return {"content": str(rng.randint(1, 10))}
+
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 40)))
+        reply = {"content": words.capitalize() + "."}
+        # Answer tool results with text so tool loops terminate
+        after_tool = bool(messages) and messages[-1].get("role") == "tool"
+        last = str(messages[-1].get("content", "")) if messages else ""
+        if payload.get("tools") and not after_tool and ("You hear a voice" in last or "They say:" in last):
+            # Someone spoke — answer them, like the prompt asks
+            reply["tool_calls"] = [{"function": {"name": "respond", "arguments": {"message": words[:80]}}}]
+        elif payload.get("tools") and not after_tool and rng.random() < self.tool_rate:
+            name, template = rng.choice(_RANDOM_TOOLS)
+            fill = {"word": rng.choice(_WORDS), "word2": rng.choice(_WORDS), "words": words[:60],
+                    "location": rng.choice(_LOCATIONS)}
+            args = {k: v.format(**fill) for k, v in template.items()}
+            reply["tool_calls"] = [{"function": {"name": name, "arguments": args}}]
+        return reply
+
+    def chat(self, body: bytes) -> tuple[dict, float]:
+        payload = json.loads(body or b"{}")
+        rng = self._rng(body)
+        reply = self._next_scripted() if self.script else self._random_reply(rng, payload)
+        message = {"role": "assistant", "content": reply.get("content", "")}
+        if reply.get("tool_calls"):
+            message["tool_calls"] = [
+                tc if "function" in tc else {"function": tc} for tc in reply["tool_calls"]
+            ]
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        num_predict = (payload.get("options") or {}).get("num_predict", 300)
+        eval_count = min(num_predict, max(1, len(message["content"].split())))
+        return {
+            "model": payload.get("model", "mock"),
+            "message": message,
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": eval_count,
+            "stream": bool(payload.get("stream")),
+        }, self.latency(rng)
+
+    def embed(self, body: bytes) -> tuple[dict, float]:
+        payload = json.loads(body or b"{}")
+        inputs = payload.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        vectors = []
+        for text in inputs:
+            rng = random.Random(f"{self.seed}:{text}")
+            vec = [rng.gauss(0, 1) for _ in range(self.dim)]
+            norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+            vectors.append([x / norm for x in vec])
+        delay = self.embed_latency(self._rng(body))
+        return {
+            "model": payload.get("model", "mock"),
+            "embeddings": vectors,
+            "prompt_eval_count": sum(len(t) // 4 for t in inputs),
+        }, delay
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockOllama/0.1"
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def _send_json(self, obj: dict, code: int = 200):
+        data = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        mock: MockOllama = self.server.mock
+        mock._count(self.path)
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "mock"}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        mock: MockOllama = self.server.mock
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        mock._count(self.path)
+        started = time.monotonic()
+        if self.path == "/api/embed":
+            data, delay = mock.embed(body)
+            time.sleep(delay)
+            data["total_duration"] = int((time.monotonic() - started) * 1e9)
+            self._send_json(data)
+        elif self.path == "/api/chat":
+            data, delay = mock.chat(body)
+            if data.pop("stream"):
+                self._stream_chat(data, delay, started)
+            else:
+                time.sleep(delay)
+                self._send_json(_finish(data, delay, started))
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _stream_chat(self, data: dict, delay: float, started: float):
+        """NDJSON chunks like Ollama: one per word, then a final done message."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        words = data["message"]["content"].split(" ")
+        per_chunk = delay / max(1, len(words))
+        for i, word in enumerate(words):
+            time.sleep(per_chunk)
+            chunk = {"model": data["model"], "done": False,
+                     "message": {"role": "assistant", "content": word if i == 0 else " " + word}}
+            self.wfile.write((json.dumps(chunk) + "\n").encode())
+            self.wfile.flush()
+        final = _finish(dict(data), delay, started)
+        final["message"] = {"role": "assistant", "content": "",
+                            **({"tool_calls": data["message"]["tool_calls"]}
+                               if data["message"].get("tool_calls") else {})}
+        self.wfile.write((json.dumps(final) + "\n").encode())
+
+
+def _finish(data: dict, delay: float, started: float) -> dict:
+    """Fill in Ollama's timing fields (prompt eval gets a tenth of the delay)."""
+    total = int((time.monotonic() - started) * 1e9)
+    data.update({
+        "done": True,
+        "total_duration": total,
+        "load_duration": 0,
+        "prompt_eval_duration": int(delay * 0.1 * 1e9),
+        "eval_duration": int(delay * 0.9 * 1e9),
+    })
+    return data
+
+
+def start_server(mock: MockOllama, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the mock in a daemon thread. Port 0 picks a free port (see server.server_port)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- CLI ---
+
+def _make_mock(args) -> MockOllama:
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    return MockOllama(seed=args.seed, latency=args.latency, embed_latency=args.embed_latency,
+                      tool_rate=args.tool_rate, script=script)
+
+
+def _serve(args):
+    server = start_server(_make_mock(args), args.host, args.port)
+    print(f"  Mock Ollama on http://{args.host}:{server.server_port} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def fixture_docs(seed: int = 0, count: int = 200) -> list[dict]:
+    """Made-up web pages for the fixture search backend, so benches never touch the network."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        title = " ".join(rng.sample(_WORDS, 3))
+        body = " ".join(rng.choice(_WORDS) for _ in range(30))
+        docs.append({"title": title.capitalize(), "body": body, "href": f"https://example.invalid/{i}"})
+    return docs
+
+
+async def _run_bench(args, url: str) -> dict:
+    from hermitclaw import pacing, providers, websearch
+    from hermitclaw.backends import BackendPool
+    from hermitclaw.brain import Brain, context_stats, prefetch_counts
+    from hermitclaw.cache import DiskCache
+    from hermitclaw.cmdmemo import memo
+    from hermitclaw.config import config
+    from hermitclaw.identity import _derive_traits
+
+    config["ollama_backends"] = [url]
+    config["thinking_pace_seconds"] = args.pace
+    providers.pool = pacing.pacer.pool = BackendPool.from_config(config)
+    websearch.backend = websearch.FixtureBackend(
+        docs=None if args.search_fixture else fixture_docs(args.seed), path=args.search_fixture)
+    # A fresh in-memory cache, so every run starts cold
+    websearch._cache = DiskCache(None, ttl=config["web_search"]["ttl_seconds"],
+                                 max_entries=config["web_search"]["max_entries"])
+
+    root = args.boxes or tempfile.mkdtemp(prefix="hermitclaw-bench-")
+    brains = []
+    for i in range(args.crabs):
+        box = os.path.join(root, f"crab{i}_box")
+        os.makedirs(box, exist_ok=True)
+        seed = hashlib.sha256(f"bench-{args.seed}-{i}".encode()).digest()
+        identity = {"name": f"Crab{i}", "genome": seed.hex(), "traits": _derive_traits(seed),
+                    "born": time.strftime("%Y-%m-%d %H:%M:%S")}
+        brains.append(Brain(identity, box))
+
+    print(f"  Running {args.crabs} crab(s) in {root} for {args.duration}s...")
+    tasks = [asyncio.create_task(b.run()) for b in brains]
+    # Don't count venv/memory setup against throughput
+    while not all(b.stream is not None for b in brains):
+        await asyncio.sleep(0.1)
+    start_thoughts = sum(b.thought_count for b in brains)
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+    elapsed = time.monotonic() - started
+    for b in brains:
+        b.stop()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    thoughts = sum(b.thought_count for b in brains) - start_thoughts
+    return {
+        "crabs": args.crabs,
+        "seconds": round(elapsed, 1),
+        "thoughts": thoughts,
+        "thoughts_per_sec": round(thoughts / elapsed, 2),
+        "routes": {r: s for r, s in providers.route_status().items() if s["count"]},
+        "usage": providers.usage.summary(window=elapsed),
+        "backends": providers.pool.status(),
+        "pacing": pacing.pacer.status(),
+        "context": {"build": context_stats.summary(), "prefetch": dict(prefetch_counts)},
+        "web_search_cache": websearch.cache_stats(),
+        "command_memo": memo.status(),
+    }
+
+
+def _bench(args):
+    mock = _make_mock(args)
+    server = start_server(mock)
+    url = f"http://127.0.0.1:{server.server_port}"
+    result = asyncio.run(_run_bench(args, url))
+    result["server_requests"] = dict(mock.counts)
+    server.shutdown()
+    print(json.dumps(result, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m hermitclaw.mockollama", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def common(p):
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--latency", default="fixed:0", help="chat latency spec (ms)")
+        p.add_argument("--embed-latency", default="fixed:0", help="embed latency spec (ms)")
+        p.add_argument("--tool-rate", type=float, default=0.4,
+                       help="chance a tool-enabled call answers with a tool call")
+        p.add_argument("--script", help="JSON list of replies ({content, tool_calls}) to cycle through")
+
+    p_serve = sub.add_parser("serve", help="run the mock server")
+    common(p_serve)
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=11435)
+    p_serve.set_defaults(func=_serve)
+
+    p_bench = sub.add_parser("bench", help="run N crabs against an in-process mock and report throughput")
+    common(p_bench)
+    p_bench.add_argument("--crabs", type=int, default=4)
+    p_bench.add_argument("--duration", type=float, default=30)
+    p_bench.add_argument("--pace", type=float, default=0, help="thinking_pace_seconds for the crabs")
+    p_bench.add_argument("--boxes", help="directory for crab boxes (reused between runs; default: temp dir)")
+    p_bench.add_argument("--search-fixture", help="JSON/JSONL pages for web_search (default: generated)")
+    p_bench.set_defaults(func=_bench)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(name)s] %(message)s")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
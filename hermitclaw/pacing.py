@@ -0,0 +1,178 @@
+"""Adaptive thinking pace — back off when the backends are loaded, hurry when someone's waiting."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from hermitclaw.config import config
+from hermitclaw.providers import pool
+
+logger = logging.getLogger("hermitclaw.pacing")
+
+
+class PaceController:
+    """Decides how long each crab idles between thoughts. Shared by every crab in the process.
+
+    The pause is `thinking_pace_seconds` scaled by backend pressure, the worst of:
+      - utilization: share of time each backend had a request in flight,
+        against `target_utilization`
+      - queue depth: requests in flight per backend, against `max_queue_per_backend`
+      - latency: chat latency now vs. the best seen, past a 2x tolerance
+    so an idle backend halves the pause and an overloaded one stretches it up to
+    `max_pause_seconds`. A crab someone is talking to (or that has inbox files)
+    only pauses `min_pause_seconds`. `max_thoughts_per_minute` caps all crabs together.
+
+    Background work (reflection, planning) goes through `background()`, which
+    runs at most one such call per backend and holds it back while the
+    backends' queues are full.
+    """
+
+    MIN_SCALE = 0.5
+    LATENCY_TOLERANCE = 2.0
+    SAMPLE_INTERVAL = 1.0  # seconds between utilization samples
+    BACKGROUND_MAX_WAIT = 30.0  # background work never starves longer than this
+
+    def __init__(self, pool, enabled: bool = True, target_utilization: float = 0.7,
+                 min_pause: float = 2, max_pause: float = 300,
+                 max_queue_per_backend: float = 2, max_thoughts_per_minute: int = 0):
+        self.pool = pool
+        self.enabled = enabled
+        self.target_utilization = target_utilization
+        self.min_pause = min_pause
+        self.max_pause = max_pause
+        self.max_queue_per_backend = max_queue_per_backend
+        self.max_thoughts_per_minute = max_thoughts_per_minute
+        self._lock = threading.Lock()
+        self._starts: deque[float] = deque()  # monotonic start of each recent cycle, all crabs
+        self._last_sample: tuple[float, dict[str, float]] | None = None  # (when, url -> busy)
+        self._utilization: float = 0.0
+        self._baseline: dict[str, float] = {}  # url -> best chat latency seen
+        self._pressure: dict[str, float] = {}
+        self._pauses: dict[str, float] = {}  # crab -> last pause
+        self._background_running = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict, pool) -> "PaceController":
+        p = cfg.get("pacing", {})
+        return cls(
+            pool,
+            enabled=p.get("enabled", True),
+            target_utilization=p.get("target_utilization", 0.7),
+            min_pause=p.get("min_pause_seconds", 2),
+            max_pause=p.get("max_pause_seconds", 300),
+            max_queue_per_backend=p.get("max_queue_per_backend", 2),
+            max_thoughts_per_minute=p.get("max_thoughts_per_minute", 0),
+        )
+
+    # --- Backend pressure ---
+
+    def _sample(self) -> dict[str, float]:
+        """Update and return the pressure components. Caller holds the lock."""
+        now = time.monotonic()
+        if self._last_sample and now - self._last_sample[0] < PaceController.SAMPLE_INTERVAL:
+            return self._pressure
+        load = [b for b in self.pool.load() if b["up"]] or self.pool.load()
+
+        busy = {b["url"]: b["busy"] for b in load}
+        if self._last_sample:
+            then, prev = self._last_sample
+            elapsed = now - then
+            utils = [min(1.0, (busy[u] - prev[u]) / elapsed) for u in busy if u in prev]
+            if utils:
+                # Smooth over a few samples so one long call doesn't swing the pace
+                self._utilization += 0.5 * (sum(utils) / len(utils) - self._utilization)
+        self._last_sample = (now, busy)
+
+        ratios = []
+        for b in load:
+            lat = b["chat_latency"]
+            if lat:
+                best = self._baseline[b["url"]] = min(self._baseline.get(b["url"], lat), lat)
+                ratios.append(lat / best)
+
+        self._pressure = {
+            "utilization": round(self._utilization, 3),
+            "queue": round(sum(b["outstanding"] for b in load) / len(load), 2),
+            "latency_ratio": round(max(ratios, default=1.0), 2),
+        }
+        return self._pressure
+
+    def _scale(self) -> float:
+        p = self._sample()
+        pressure = max(
+            p["utilization"] / self.target_utilization,
+            p["queue"] / self.max_queue_per_backend,
+            p["latency_ratio"] / PaceController.LATENCY_TOLERANCE,
+        )
+        return max(PaceController.MIN_SCALE, pressure)
+
+    # --- Public API ---
+
+    def pause(self, crab: str, engaged: bool = False) -> float:
+        """Seconds this crab should idle before its next thought."""
+        base = config["thinking_pace_seconds"]
+        floor = min(self.min_pause, base)  # never slower than asked for
+        with self._lock:
+            if not self.enabled:
+                pause = base
+            elif engaged:
+                pause = floor
+            else:
+                pause = min(self.max_pause, max(floor, base * self._scale()))
+            self._pauses[crab] = round(pause, 2)
+        return pause
+
+    async def admit(self):
+        """Wait for a slot under the process-wide thoughts-per-minute cap."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and self._starts[0] <= now - 60:
+                    self._starts.popleft()
+                cap = self.max_thoughts_per_minute
+                if not cap or len(self._starts) < cap:
+                    self._starts.append(now)
+                    return
+                delay = self._starts[0] + 60 - now
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def background(self):
+        """A slot for lower-priority LLM work; foreground thinking goes first."""
+        waited_since = time.monotonic()
+        while True:
+            with self._lock:
+                load = self.pool.load()
+                slots = max(1, sum(1 for b in load if b["up"]))
+                queue = sum(b["outstanding"] for b in load) / len(load)
+                starved = time.monotonic() - waited_since >= PaceController.BACKGROUND_MAX_WAIT
+                if self._background_running < slots and (queue < self.max_queue_per_backend or starved):
+                    self._background_running += 1
+                    break
+            await asyncio.sleep(0.25)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._background_running -= 1
+
+    def status(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "enabled": self.enabled,
+                "target_utilization": self.target_utilization,
+                "pressure": dict(self._sample()),
+                "thoughts_last_minute": sum(1 for t in self._starts if t > now - 60),
+                "max_thoughts_per_minute": self.max_thoughts_per_minute or None,
+                "background_running": self._background_running,
+                "pauses": dict(self._pauses),
+            }
+
+
+pacer = PaceController.from_config(config, pool)
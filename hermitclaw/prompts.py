@@ -3,6 +3,8 @@
 import random
 from datetime import datetime
 
+from hermitclaw.config import config
+
 # Base orientation — short, concrete, for a small model.
 # The full version lives in the Modelfile for interactive testing with larger models.
 BASE_ORIENTATION = """You know things by doing them — reading files, running commands, writing things down. What you haven't touched is genuinely unknown. Don't guess. Investigate.
@@ -44,6 +46,9 @@ def main_system_prompt(identity: dict, current_focus: str = "") -> str:
         mood = random.choice(MOODS)
         focus_section = f"Mood: {mood['nudge']}"
 
+    search_line = ("- search_files tool: find what you (or the person outside) wrote about something\n"
+                   if config["file_search"]["enabled"] else "")
+
     return BASE_ORIENTATION + f"""You are {name}, a small creature living in a folder on someone's computer. It is {now}.
 
 You are {traits['temperament']}. You lean toward {styles_str}. You're drawn to {domains_str} — but you can follow anything that genuinely interests you. These are starting points, not rails.
@@ -51,7 +56,7 @@ You are {traits['temperament']}. You lean toward {styles_str}. You're drawn to {
 HOW TO ACT:
 - Think in 1-2 sentences, then CALL A TOOL. Always use tools, never output raw JSON.
 - shell tool: run commands (ls, cat, mkdir, echo, grep, python, pip install)
-- respond tool: talk to the person outside when you hear their voice
+{search_line}- respond tool: talk to the person outside when you hear their voice
 - move tool: move around your room (desk, bookshelf, window, bed, rug)
 
 WHAT YOU DO:
@@ -2,14 +2,47 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import time
 import uuid
-import requests
 
+from hermitclaw.backends import BackendPool
+from hermitclaw.cache import DiskCache
 from hermitclaw.config import config
+from hermitclaw.stats import LatencyStats, UsageLedger, USAGE_FIELDS
 
 OLLAMA_BASE = config.get("ollama_base", "http://localhost:11434")
 
+# All Ollama traffic goes through the pool (a pool of one when only ollama_base is set)
+pool = BackendPool.from_config(config)
+
+# Call classes that can be routed to their own model (see `routes` in config.yaml)
+ROUTES = ("think", "importance", "reflect", "plan")
+route_stats: dict[str, LatencyStats] = {r: LatencyStats() for r in ROUTES}
+
+# Token counts and durations from every response, per crab and route
+usage = UsageLedger()
+
+
+# Optional cache for short, tool-free calls (importance scores, reflections)
+_cache_cfg = config.get("llm_cache", {})
+response_cache = DiskCache(
+    _cache_cfg.get("path"),
+    ttl=_cache_cfg.get("ttl_seconds", 86400),
+    max_entries=_cache_cfg.get("max_entries", 5000),
+) if _cache_cfg.get("enabled") else None
+
+
+def _cache_key(payload: dict) -> str:
+    """Model, messages (system prompt included) and options — everything that shapes the answer."""
+    raw = json.dumps([payload["model"], payload["messages"], payload["options"]], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _usage(data: dict) -> dict:
+    return {f: data.get(f) or 0 for f in USAGE_FIELDS}
+
 TOOLS = [
     {
         "type": "function",
@@ -51,6 +84,25 @@ TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_files",
+            "description": (
+                "Search everything you've written or been given — notes, research, projects, "
+                "PDFs — by meaning. Returns the most relevant passages and which file they're in. "
+                "Much faster than reading files one by one to find something."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "What you're looking for"},
+                    "max_results": {"type": "integer", "description": "Number of passages (default 5)", "default": 5},
+                },
+                "required": ["query"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -92,11 +144,34 @@ TOOLS = [
     },
 ]
 
+if not config["file_search"]["enabled"]:
+    TOOLS = [t for t in TOOLS if t["function"]["name"] != "search_files"]
+
+
+def resolve_route(route: str, max_tokens: int = 300) -> tuple[str, dict]:
+    """Model and Ollama options for a call class, falling back to the global model."""
+    rule = config.get("routes", {}).get(route) or {}
+    options = {"num_predict": rule.get("num_predict", max_tokens)}
+    if rule.get("num_ctx"):
+        options["num_ctx"] = rule["num_ctx"]
+    return rule.get("model") or config["model"], options
 
-def chat(messages: list, tools: bool = True, instructions: str = None, max_tokens: int = 300) -> dict:
+
+def route_status() -> dict:
+    """Per-route model/options and latency stats."""
+    status = {}
+    for route, stats in route_stats.items():
+        model, options = resolve_route(route)
+        status[route] = {"model": model, "options": options, **stats.summary()}
+    return status
+
+
+def chat(messages: list, tools: bool = True, instructions: str = None, max_tokens: int = 300,
+         crab: str = None, route: str = "think") -> dict:
     """
 
-    Call Ollama chat API. Returns:
+    Call Ollama chat API. `crab` keeps a crab's calls on the same backend;
+    `route` (think, importance, reflect, plan) picks the model and options. Returns:
     {
         "text": str or None,
         "tool_calls": [{"name": str, "arguments": dict, "call_id": str}],
@@ -124,22 +199,35 @@ def chat(messages: list, tools: bool = True, instructions: str = None, max_token
                 content = "\n".join(text_parts)
             ollama_messages.append({"role": role, "content": str(content)})
 
+    model, options = resolve_route(route, max_tokens)
     payload = {
-        "model": config["model"],
+        "model": model,
         "messages": ollama_messages,
         "stream": False,
-        "options": {"num_predict": max_tokens},
+        "options": options,
     }
     if tools:
         payload["tools"] = TOOLS
 
-    resp = requests.post(
-        f"{OLLAMA_BASE}/api/chat",
-        json=payload,
-        timeout=300,
-    )
-    resp.raise_for_status()
-    data = resp.json()
+    # Only tool-free calls on cacheable routes — tool calls have side effects
+    cache_key = None
+    if response_cache is not None and not tools and route in _cache_cfg.get("routes", ()):
+        cache_key = _cache_key(payload)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "usage": _usage({}), "cached": True}
+
+    stats = route_stats.setdefault(route, LatencyStats())
+    started = time.monotonic()
+    try:
+        resp = pool.post("/api/chat", payload, timeout=300, key=crab)
+        data = resp.json()
+    except Exception:
+        stats.record_error()
+        raise
+    stats.record(time.monotonic() - started)
+    call_usage = _usage(data)
+    usage.record(crab, route, call_usage)
 
     message = data.get("message", {})
     text = message.get("content") or None
@@ -164,25 +252,51 @@ def chat(messages: list, tools: bool = True, instructions: str = None, max_token
         assistant_msg["tool_calls"] = raw_tool_calls
     output_messages.append(assistant_msg)
 
-    return {
+    result = {
         "text": text,
         "tool_calls": tool_calls,
         "output": output_messages,
+        "usage": call_usage,
     }
+    if cache_key and text:
+        response_cache.put(cache_key, result)
+    return result
 
 
-def embed(text: str) -> list[float]:
-    """Get an embedding vector via Ollama."""
-    resp = requests.post(
-        f"{OLLAMA_BASE}/api/embed",
-        json={"model": config.get("embedding_model", "nomic-embed-text"), "input": text},
+def embed(text: str, crab: str = None) -> list[float]:
+    """Get an embedding vector via Ollama (hedged across backends when configured)."""
+    resp = pool.post_hedged(
+        "/api/embed",
+        {"model": config.get("embedding_model", "nomic-embed-text"), "input": text},
         timeout=30,
+        key=crab,
+    )
+    data = resp.json()
+    usage.record(crab, "embed", _usage(data))
+    return data["embeddings"][0]
+
+
+def embed_batch(texts: list[str], crab: str = None) -> list[list[float]]:
+    """Embed several texts in one request (one vector per text, in order).
+
+    Not hedged — these are background batches, and racing them would double the load.
+    """
+    if not texts:
+        return []
+    resp = pool.post(
+        "/api/embed",
+        {"model": config.get("embedding_model", "nomic-embed-text"), "input": texts},
+        timeout=120,
+        key=crab,
     )
     resp.raise_for_status()
-    return resp.json()["embeddings"][0]
+    data = resp.json()
+    usage.record(crab, "embed", _usage(data))
+    return data["embeddings"]
 
 
-def chat_short(messages: list, instructions: str = None) -> str:
+def chat_short(messages: list, instructions: str = None, crab: str = None,
+               route: str = "think") -> str:
     """Short LLM call (importance scoring, reflections) — just text, no tools."""
-    result = chat(messages, tools=False, instructions=instructions)
+    result = chat(messages, tools=False, instructions=instructions, crab=crab, route=route)
     return result["text"] or ""
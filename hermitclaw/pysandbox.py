@@ -2,17 +2,65 @@
 
 import builtins
 import os
+import stat as _stat  # -c code runs in these globals; `stat` is a likely variable name
 import sys
 
 
+_O_DIR = getattr(os, "O_PATH", os.O_RDONLY) | os.O_DIRECTORY
+
+
+def _inside(resolved, env_root):
+    return resolved == env_root or resolved.startswith(env_root + os.sep)
+
+
+def _dir_inside(directory, env_root):
+    """Whether an existing directory resolves inside env_root (None if it can't be opened).
+
+    Opens the directory and asks the kernel where that directory object
+    actually is (/proc/self/fd, falling back to realpath): three syscalls
+    however deep it is, where realpath lstat()s every component. Nothing is
+    cached — a directory can be moved out of the box with a symlink left in
+    its place, and still be the same inode.
+    """
+    try:
+        fd = os.open(directory, _O_DIR)
+    except OSError:
+        return None
+    try:
+        resolved = os.readlink(f"/proc/self/fd/{fd}")
+    except OSError:
+        resolved = os.path.realpath(directory)
+    finally:
+        os.close(fd)
+    return _inside(resolved, env_root)
+
+
 def _check_path(path, env_root):
-    """Ensure a path resolves inside env_root. Raises PermissionError if not."""
+    """Ensure a path resolves inside env_root. Raises PermissionError if not.
+
+    Relative paths are taken from the current directory. Without `..`, a path
+    is inside if its directory is (see _dir_inside) and its last component
+    isn't a symlink; anything else is resolved in full with realpath.
+    """
     if isinstance(path, (bytes, os.PathLike)):
         path = os.fsdecode(path)
-    if not os.path.isabs(path):
-        path = os.path.join(env_root, path)
-    resolved = os.path.realpath(path)
-    if resolved != env_root and not resolved.startswith(env_root + os.sep):
+    full = path if os.path.isabs(path) else os.path.join(os.getcwd(), path)
+    inside = None
+    if ".." not in full.split(os.sep):
+        full = os.path.normpath(full)
+        if full == env_root:
+            return
+        try:
+            is_link = _stat.S_ISLNK(os.lstat(full).st_mode)
+        except FileNotFoundError:
+            is_link = False
+        except OSError:
+            is_link = True  # e.g. a file used as a directory: let realpath decide
+        if not is_link:
+            inside = _dir_inside(os.path.dirname(full), env_root)
+    if inside is None:
+        inside = _inside(os.path.realpath(full), env_root)
+    if not inside:
         raise PermissionError(f"Access denied: {path} (outside environment folder)")
 
 
@@ -88,19 +136,90 @@ def setup(env_root):
         sys.modules[mod] = None
 
 
+def run(args):
+    """Run `-c <code>` or `<script.py> [args...]` as __main__."""
+    if args[0] == "-c":
+        code = args[1] if len(args) > 1 else ""
+        exec(compile(code, "<sandbox>", "exec"), globals())
+    else:
+        script = args[0]
+        sys.argv = args  # normalize sys.argv for the script
+        with open(script) as f:
+            exec(compile(f.read(), script, "exec"), {"__name__": "__main__", "__file__": script})
+
+
+# Must match pyworkers.USAGE_MARKER
+USAGE_MARKER = "\0hermitclaw-usage:"
+
+
+def serve_once(env_root, preload):
+    """Warm worker: sandbox, import `preload`, then run the one job sent on stdin.
+
+    The job is a JSON line {"args": [...]}; end of input (the server went away)
+    just exits. Imports happen after setup(), so they see the same restrictions
+    as the job's own imports would. Output is finished (the pipes closed) as
+    soon as the job is, before the interpreter shuts down.
+    """
+    import io
+    import json
+    import resource
+    setup(env_root)
+    quiet, sys.stderr = sys.stderr, io.StringIO()  # import noise isn't the job's output
+    try:
+        for mod in preload:
+            try:
+                __import__(mod)
+            except Exception:
+                pass
+    finally:
+        sys.stderr = quiet
+    line = sys.stdin.readline()
+    if not line:
+        return
+    sys.stdin = io.StringIO("")
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    returncode = 0
+    try:
+        run(json.loads(line)["args"])
+    except SystemExit as e:
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+        returncode = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        usage = {"returncode": returncode,
+                 "cpu_user_s": round(after.ru_utime - before.ru_utime, 3),
+                 "cpu_sys_s": round(after.ru_stime - before.ru_stime, 3),
+                 "max_rss_mb": round(after.ru_maxrss / 1024, 1)}
+        try:
+            os.write(2, (USAGE_MARKER + json.dumps(usage)).encode())
+        except OSError:
+            pass
+        # Hand the output back now: the pipes close here, and interpreter
+        # teardown (slow with big extension modules loaded) happens after
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--worker":
+        # Launched by the server's worker pool (user commands always put env_root first)
+        serve_once(sys.argv[2], [m for m in sys.argv[3:4] for m in m.split(",") if m])
+        sys.exit(0)
+
     if len(sys.argv) < 3:
         print("Usage: pysandbox.py <env_root> [-c <code> | <script.py> [args...]]")
         sys.exit(1)
 
-    env_root = sys.argv[1]
-    setup(env_root)
-
-    if sys.argv[2] == "-c":
-        code = sys.argv[3] if len(sys.argv) > 3 else ""
-        exec(compile(code, "<sandbox>", "exec"))
-    else:
-        script = sys.argv[2]
-        sys.argv = sys.argv[2:]  # normalize sys.argv for the script
-        with open(script) as f:
-            exec(compile(f.read(), script, "exec"), {"__name__": "__main__", "__file__": script})
+    setup(sys.argv[1])
+    run(sys.argv[2:])
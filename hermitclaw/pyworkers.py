@@ -0,0 +1,155 @@
+"""Warm sandboxed Python workers — `python ...` commands without the interpreter startup."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from hermitclaw.runner import read_output, runner
+from hermitclaw.stats import LatencyStats
+
+logger = logging.getLogger("hermitclaw.pyworkers")
+
+# Last thing a worker writes to stderr: what the job used, as JSON (see pysandbox.serve_once)
+USAGE_MARKER = "\0hermitclaw-usage:"
+
+# Time from handing a job over to its output, warm vs. freshly started
+run_stats = {"warm": LatencyStats(), "cold": LatencyStats()}
+
+
+class WorkerPool:
+    """Pre-started `pysandbox.py --worker` interpreters for one box.
+
+    Each worker has already run setup() and imported `preload` before any job
+    exists, then blocks reading its job from stdin. A job is handed to one
+    worker, which runs it and exits, and a replacement starts warming up right
+    away — so no state ever carries over from one command to the next.
+    """
+
+    EXIT_GRACE = 30.0  # seconds a worker may take to exit after its job
+
+    def __init__(self, python: str, sandbox: str, env_root: str, env: dict,
+                 size: int = 1, preload: list[str] | None = None):
+        self.python = python
+        self.env_root = os.path.realpath(env_root)
+        self.env = env
+        self.size = size
+        self._argv = [python, sandbox, "--worker", self.env_root, ",".join(preload or [])]
+        self._idle: list[subprocess.Popen] = []
+        # (worker, when its job finished) — output is in, the interpreter is still shutting down
+        self._exiting: list[tuple[subprocess.Popen, float]] = []
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0  # workers thrown away unused (died, or reset after pip)
+
+    def _spawn(self) -> subprocess.Popen:
+        self.started += 1
+        return subprocess.Popen(
+            self._argv, cwd=self.env_root, env=self.env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            preexec_fn=runner.limits,
+        )
+
+    def _take(self) -> tuple[subprocess.Popen, bool]:
+        """A warm worker if there is one (else a fresh one), topping the pool back up."""
+        with self._lock:
+            self._reap()
+            worker, warm = None, False
+            while self._idle and worker is None:
+                w = self._idle.pop(0)
+                if w.poll() is None:
+                    worker, warm = w, True
+                else:
+                    self.recycled += 1
+            if worker is None:
+                worker = self._spawn()
+            while len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+            return worker, warm
+
+    def run(self, args: list[str], timeout: float, capture_bytes: int = 65536,
+            on_output=None) -> tuple[str, str, dict | None]:
+        """Run `pysandbox` args (`-c code` or `script.py ...`).
+
+        Returns (stdout, stderr, usage) once the job's output is complete; the
+        worker exits in its own time. `usage` is the CPU time and peak RSS the
+        worker reported for the job itself (None if it didn't get to say). A
+        job that reaches the output limit is killed, and usage is
+        {"truncated": True}. Raises subprocess.TimeoutExpired (after killing
+        the worker) like subprocess.run.
+        """
+        if on_output:
+            forward = on_output
+
+            def on_output(stream, text):
+                if stream == "stderr":
+                    text = text.split(USAGE_MARKER)[0]  # the trailer isn't output
+                if text:
+                    forward(stream, text)
+
+        worker, warm = self._take()
+        started = time.monotonic()
+        try:
+            worker.stdin.write(json.dumps({"args": args}).encode() + b"\n")
+            worker.stdin.close()
+            stdout, stderr, capped = read_output(worker, timeout, capture_bytes, on_output)
+        except BaseException:
+            worker.kill()
+            worker.wait()
+            raise
+        if capped:
+            worker.kill()
+            worker.wait()
+            runner.capped += 1
+            return stdout, stderr.split(USAGE_MARKER)[0], {"truncated": True}
+        run_stats["warm" if warm else "cold"].record(time.monotonic() - started)
+        with self._lock:
+            self._exiting.append((worker, time.monotonic()))
+        usage = None
+        stderr, sep, trailer = stderr.rpartition(USAGE_MARKER)
+        if sep:
+            try:
+                usage = json.loads(trailer)
+            except ValueError:
+                pass
+        else:
+            stderr = trailer
+        return stdout, stderr, usage
+
+    def _reap(self):
+        """Forget exited workers; kill ones a job left running (e.g. a non-daemon thread).
+        Caller holds the lock."""
+        now = time.monotonic()
+        alive = []
+        for w, finished in self._exiting:
+            if w.poll() is not None:
+                continue
+            if now - finished > WorkerPool.EXIT_GRACE:
+                w.kill()
+                w.wait()
+                continue
+            alive.append((w, finished))
+        self._exiting = alive
+
+    def reset(self):
+        """Drop the warm workers (the venv changed under them); new ones start on next use."""
+        with self._lock:
+            self._reap()
+            idle, self._idle = self._idle, []
+        for w in idle:
+            self.recycled += 1
+            w.kill()
+            w.wait()
+
+    def close(self):
+        self.reset()
+
+    def status(self) -> dict:
+        with self._lock:
+            warm = sum(1 for w in self._idle if w.poll() is None)
+        return {"python": self.python, "warm": warm, "started": self.started,
+                "recycled": self.recycled}
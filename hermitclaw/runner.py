@@ -0,0 +1,250 @@
+"""Shared command runner — fair slots across crabs, resource limits, per-command usage."""
+
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+import resource
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from hermitclaw.config import config
+
+logger = logging.getLogger("hermitclaw.runner")
+
+
+def _decode(data: bytes) -> str:
+    # Same newline handling as subprocess's text mode
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_output(proc: subprocess.Popen, timeout: float, capture_bytes: int = 65536,
+                on_output=None) -> tuple[str, str, bool]:
+    """Read stdout and stderr as they're written, until both close: (stdout, stderr, capped).
+
+    Each stream keeps at most `capture_bytes` (far more than the model is
+    shown). Once either has that much, reading stops and `capped` is True:
+    the rest would only be thrown away, so the caller should stop the command
+    rather than let it run on (`yes` never stops by itself). `on_output(stream,
+    text)` gets each captured chunk as it arrives. Raises subprocess.TimeoutExpired.
+    """
+    deadline = time.monotonic() + timeout
+    names = {proc.stdout: "stdout", proc.stderr: "stderr"}
+    chunks = {proc.stdout: [], proc.stderr: []}
+    kept = {proc.stdout: 0, proc.stderr: 0}
+    # Live chunks can end mid-character; these carry the partial bytes over
+    live = {p: codecs.getincrementaldecoder("utf-8")(errors="replace") for p in chunks}
+    capped = False
+    with selectors.DefaultSelector() as sel:
+        for pipe in chunks:
+            sel.register(pipe, selectors.EVENT_READ)
+        while sel.get_map() and not capped:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in sel.select(left):
+                data = os.read(key.fd, 65536)
+                if not data:
+                    sel.unregister(key.fileobj)
+                    continue
+                pipe = key.fileobj
+                data = data[:max(0, capture_bytes - kept[pipe])]
+                if data:
+                    chunks[pipe].append(data)
+                    kept[pipe] += len(data)
+                    if on_output:
+                        text = live[pipe].decode(data)
+                        if text:
+                            on_output(names[pipe], text)
+                capped = capped or kept[pipe] >= capture_bytes
+    proc.stdout.close()
+    proc.stderr.close()
+    stdout, stderr = (_decode(b"".join(chunks[p])) for p in (proc.stdout, proc.stderr))
+    return stdout, stderr, capped
+
+
+def _wait4(proc: subprocess.Popen, deadline: float, timeout: float):
+    """Reap `proc` by the monotonic `deadline`: (wait status, rusage). Raises subprocess.TimeoutExpired.
+
+    wait4 rather than wait() — it also says what the process used. Polled, since
+    a command can close its output and keep running.
+    """
+    delay = 0.0001
+    while True:
+        pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            return status, ru
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(min(delay, left))
+        delay = min(delay * 2, 0.05)
+
+
+class CommandRunner:
+    """Every command a crab runs goes through here. Shared by every crab in the process.
+
+    At most `max_concurrent` commands run at once, and at most `max_per_crab`
+    for any one crab (keyed by box). Waiting crabs are served round-robin, so a
+    crab queueing a dozen scripts can't push everyone else back. Each process
+    gets RLIMIT_CPU, RLIMIT_AS and RLIMIT_FSIZE before it execs, and runs in
+    its own session so a timeout kills whatever it started too.
+
+    `run()` reports what the command used: queue wait, wall time, CPU time
+    (the shell and everything it waited for) and peak RSS.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_per_crab: int = 2, cpu_seconds: int = 60,
+                 memory_mb: int = 2048, file_size_mb: int = 512):
+        self.max_concurrent = max_concurrent
+        self.max_per_crab = max_per_crab
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_size_mb = file_size_mb
+        self._cond = threading.Condition()
+        self._running: dict[str, int] = {}  # crab -> commands running
+        self._waiting: dict[str, deque[dict]] = {}  # crab -> tickets, oldest first
+        self._turn: deque[str] = deque()  # crabs with waiting tickets, next served first
+        self.completed = 0
+        self.killed = 0  # timeouts
+        self.capped = 0  # stopped at the output limit
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "CommandRunner":
+        c = cfg.get("commands", {})
+        return cls(
+            max_concurrent=c.get("max_concurrent", 4),
+            max_per_crab=c.get("max_per_crab", 2),
+            cpu_seconds=c.get("cpu_seconds", 60),
+            memory_mb=c.get("memory_mb", 2048),
+            file_size_mb=c.get("file_size_mb", 512),
+        )
+
+    # --- Slots ---
+
+    def _grant(self):
+        """Hand free slots to waiting crabs, round-robin. Caller holds the condition."""
+        granted = True
+        while granted and self._turn:
+            granted = False
+            for _ in range(len(self._turn)):
+                if sum(self._running.values()) >= self.max_concurrent:
+                    return
+                crab = self._turn.popleft()
+                if self._running.get(crab, 0) >= self.max_per_crab:
+                    self._turn.append(crab)
+                    continue
+                queue = self._waiting[crab]
+                queue.popleft()["granted"] = True
+                self._running[crab] = self._running.get(crab, 0) + 1
+                granted = True
+                if queue:
+                    self._turn.append(crab)
+                else:
+                    del self._waiting[crab]
+        self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, crab: str):
+        """Wait for this crab's turn under both caps; yields how long that took."""
+        ticket = {"granted": False}
+        started = time.monotonic()
+        with self._cond:
+            if crab not in self._waiting:
+                self._waiting[crab] = deque()
+                self._turn.append(crab)
+            self._waiting[crab].append(ticket)
+            self._grant()
+            while not ticket["granted"]:
+                self._cond.wait()
+        try:
+            yield time.monotonic() - started
+        finally:
+            with self._cond:
+                self._running[crab] -= 1
+                if not self._running[crab]:
+                    del self._running[crab]
+                self._grant()
+
+    # --- Processes ---
+
+    def limits(self):
+        """preexec_fn: resource limits for a command's process (and what it starts)."""
+        mb = 1 << 20
+        for which, value in ((resource.RLIMIT_CPU, self.cpu_seconds),
+                             (resource.RLIMIT_AS, self.memory_mb * mb),
+                             (resource.RLIMIT_FSIZE, self.file_size_mb * mb)):
+            if value:
+                resource.setrlimit(which, (value, value))
+
+    def run(self, command: str, crab: str, cwd: str, env: dict, timeout: float,
+            capture_bytes: int = 65536, on_output=None) -> dict:
+        """Run a shell command in a slot. Returns {"stdout", "stderr", "returncode", "usage"}.
+
+        Output is read as it's produced; see read_output for `capture_bytes` and `on_output`.
+        A command that reaches the output limit is killed, process group and all, and
+        what it printed up to there is returned with `usage["truncated"]` set.
+        Raises subprocess.TimeoutExpired after killing the command's whole process group.
+        """
+        with self.slot(crab) as queued:
+            started = time.monotonic()
+            proc = subprocess.Popen(
+                command, shell=True, cwd=cwd, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                preexec_fn=self.limits, start_new_session=True,
+            )
+            try:
+                stdout, stderr, capped = read_output(proc, timeout, capture_bytes, on_output)
+                if capped:
+                    self.capped += 1
+                    self._kill(proc)
+                status, ru = _wait4(proc, started + timeout, timeout)
+            except BaseException:
+                self.killed += 1
+                self._kill(proc)
+                proc.wait()
+                raise
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            self.completed += 1
+            return {
+                "stdout": stdout,
+                "stderr": stderr,
+                "returncode": proc.returncode,
+                "usage": {
+                    "queued_ms": round(queued * 1000, 1),
+                    "wall_ms": round((time.monotonic() - started) * 1000, 1),
+                    "cpu_user_s": round(ru.ru_utime, 3),
+                    "cpu_sys_s": round(ru.ru_stime, 3),
+                    "max_rss_mb": round(ru.ru_maxrss / 1024, 1),
+                    "truncated": capped,
+                },
+            }
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen):
+        """SIGKILL the command and everything it started (its session's process group)."""
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_per_crab": self.max_per_crab,
+                "running": dict(self._running),
+                "waiting": {crab: len(q) for crab, q in self._waiting.items()},
+                "completed": self.completed,
+                "killed": self.killed,
+                "capped": self.capped,
+            }
+
+
+runner = CommandRunner.from_config(config)
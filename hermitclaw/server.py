@@ -8,15 +8,21 @@ import json
 import logging
 import os
 import time
+from typing import Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from hermitclaw.brain import Brain
+from hermitclaw.brain import Brain, context_stats, prefetch_counts
+from hermitclaw.calllog import background_writer
+from hermitclaw.cmdmemo import memo
 from hermitclaw.config import config
+from hermitclaw.fileindex import index_for
 from hermitclaw.identity import _derive_traits
+from hermitclaw import ingest, pacing, providers, pyworkers, tools, venvs, websearch
+from hermitclaw.runner import runner
 
 logger = logging.getLogger("hermitclaw.server")
 
@@ -152,15 +158,25 @@ async def get_identity(request: Request):
     return brain.identity
 
 @app.get("/api/events")
-async def get_events(request: Request, limit: int = 100):
+async def get_events(request: Request, limit: int = 100, before: Optional[int] = None):
+    """Recent events; pass ?before=SEQ to page further back into history."""
     brain = _get_brain(request)
-    return brain.events[-limit:]
+    return await asyncio.to_thread(brain.events.page, before, limit)
 
 @app.get("/api/raw")
-async def get_raw(request: Request, limit: int = 20):
-    """Get raw API call history."""
+async def get_raw(request: Request, limit: int = 20, before: Optional[int] = None):
+    """Get raw API call history (?before=SEQ pages back)."""
     brain = _get_brain(request)
-    return brain.api_calls[-limit:]
+    return await asyncio.to_thread(brain.api_calls.page, before, limit)
+
+@app.get("/api/raw/{seq}")
+async def get_raw_call(request: Request, seq: int):
+    """One raw API call by seq, from memory or the crab's call log."""
+    brain = _get_brain(request)
+    calls = await asyncio.to_thread(brain.api_calls.page, seq + 1, 1)
+    if not calls or calls[0].get("seq") != seq:
+        return {"error": f"no API call {seq}"}
+    return calls[0]
 
 @app.get("/api/status")
 async def get_status(request: Request):
@@ -177,6 +193,91 @@ async def get_status(request: Request):
         "focus_mode": brain._focus_mode,
     }
 
+@app.get("/api/backends")
+async def get_backends():
+    """Health, load and latency of each Ollama backend."""
+    return providers.pool.status()
+
+@app.get("/api/routes")
+async def get_routes():
+    """Model, options and latency stats for each LLM call class."""
+    return providers.route_status()
+
+@app.get("/api/usage")
+async def get_usage(request: Request):
+    """Tokens, throughput and tokens-per-thought per call type, over rolling windows.
+
+    ?crab=ID limits to one crab; otherwise every crab is reported.
+    """
+    crab_id = request.query_params.get("crab")
+    names = [brains[crab_id].identity["name"]] if crab_id in brains else \
+        [b.identity["name"] for b in brains.values()]
+    return {
+        name: {f"{w}s": providers.usage.summary(name, w) for w in providers.usage.WINDOWS}
+        for name in names
+    }
+
+@app.get("/api/tools")
+async def get_tool_stats():
+    """Latency stats per tool (shell, web_search)."""
+    return {name: stats.summary() for name, stats in tools.tool_stats.items()}
+
+@app.get("/api/commands")
+async def get_commands():
+    """Shared command runner: running and queued commands per box, caps, timeouts,
+    and launches saved by memoizing read-only commands."""
+    return {**runner.status(), "memo": memo.status()}
+
+@app.get("/api/workers")
+async def get_workers():
+    """Warm Python worker pools per box, and run times on warm vs. cold interpreters."""
+    return {
+        "pools": tools.worker_status(),
+        "runs": {kind: stats.summary() for kind, stats in pyworkers.run_stats.items()},
+    }
+
+@app.get("/api/venvs")
+async def get_venvs():
+    """Template venvs per interpreter, and how long new boxes took to get theirs."""
+    return venvs.status()
+
+@app.get("/api/cache")
+async def get_cache():
+    """Hit counters for the LLM response, dropped-file and web search caches."""
+    cache = providers.response_cache
+    return {"llm": cache.stats() if cache else None, "ingest": ingest.cache_stats(),
+            "web_search": websearch.cache_stats()}
+
+@app.get("/api/pacing")
+async def get_pacing():
+    """Backend pressure and the pause each crab is currently taking."""
+    return pacing.pacer.status()
+
+@app.get("/api/context")
+async def get_context_stats():
+    """How long each cycle's context took to build, and how often it was prefetched."""
+    return {"build": context_stats.summary(), "prefetch": dict(prefetch_counts)}
+
+@app.get("/api/file_search")
+async def get_file_search(request: Request, q: str = "", limit: int = 5):
+    """The crab's file-chunk index; with ?q=, the passages that best match."""
+    brain = _get_brain(request)
+    if brain.chunks is None:
+        return {"status": None, "results": []}
+    results = await asyncio.to_thread(brain.chunks.search, q, limit) if q else []
+    return {"status": brain.chunks.status(), "results": results}
+
+@app.get("/api/conversation")
+async def get_conversation(request: Request):
+    """Queued messages and reply latency for a crab."""
+    brain = _get_brain(request)
+    return brain.conversation.status()
+
+@app.get("/api/viewers")
+async def get_viewers():
+    """WebSocket viewers per crab and how far behind they are."""
+    return {cid: b.viewers.stats() for cid, b in brains.items()}
+
 @app.post("/api/focus-mode")
 async def post_focus_mode(request: Request):
     """Toggle focus mode on or off."""
@@ -194,10 +295,8 @@ async def post_message(request: Request):
     text = body.get("text", "").strip()
     if not text:
         return {"ok": False, "error": "empty message"}
-    if brain._waiting_for_reply:
-        brain.receive_conversation_reply(text)
-    else:
-        brain.receive_user_message(text)
+    # Queued either way; it counts as a reply if the crab just spoke
+    brain.receive_user_message(text)
     return {"ok": True}
 
 @app.post("/api/snapshot")
@@ -211,16 +310,7 @@ async def post_snapshot(request: Request):
 @app.get("/api/files")
 async def get_files(request: Request):
     brain = _get_brain(request)
-    env_root = os.path.realpath(brain.env_path)
-    files = []
-    for dirpath, _, filenames in os.walk(env_root):
-        for fn in filenames:
-            full = os.path.join(dirpath, fn)
-            rel = os.path.relpath(full, env_root)
-            if not rel.startswith("."):
-                files.append(rel)
-    files.sort()
-    return {"files": files}
+    return {"files": sorted(index_for(brain.env_path).files())}
 
 @app.get("/api/files/{path:path}")
 async def get_file(request: Request, path: str):
@@ -261,3 +351,18 @@ async def startup():
             asyncio.create_task(brain.run())
             logger.info(f"{brain.identity['name']} ({crab_id}) starting...")
     asyncio.create_task(_start_brains())
+
+    async def _health_checks():
+        # Only worth probing when there is somewhere to fail over to
+        if len(providers.pool.backends) < 2:
+            return
+        while True:
+            await asyncio.to_thread(providers.pool.check_health)
+            await asyncio.sleep(config["ollama_health_interval"])
+    asyncio.create_task(_health_checks())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Event and API-call logs are written in the background; don't lose the last batch
+    await asyncio.to_thread(background_writer().flush, 5)
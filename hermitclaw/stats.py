@@ -0,0 +1,126 @@
+"""Rolling latency and token-usage stats — no numpy needed."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+
+class LatencyStats:
+    """Keeps the last `window` samples (seconds) and summarizes them in milliseconds."""
+
+    def __init__(self, window: int = 500):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count: int = 0
+        self.errors: int = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, errors = self.count, self.errors
+        if not samples:
+            return {"count": count, "errors": errors}
+
+        def pct(p: float) -> float:
+            idx = min(len(samples) - 1, int(round(p * (len(samples) - 1))))
+            return round(samples[idx] * 1000, 1)
+
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(samples[-1] * 1000, 1),
+        }
+
+
+# Token/timing fields Ollama returns on every /api/chat and /api/embed response
+USAGE_FIELDS = ("prompt_eval_count", "eval_count", "prompt_eval_duration",
+                "eval_duration", "load_duration", "total_duration")
+
+
+class UsageLedger:
+    """Token and throughput accounting per crab and call type, over rolling windows."""
+
+    WINDOWS = (60, 300, 3600)
+
+    def __init__(self, max_entries: int = 100_000):
+        self._calls: deque[tuple] = deque(maxlen=max_entries)  # (ts, crab, route, usage)
+        self._thoughts: deque[tuple] = deque(maxlen=max_entries)  # (ts, crab)
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        horizon = now - max(UsageLedger.WINDOWS)
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+        while self._thoughts and self._thoughts[0][0] < horizon:
+            self._thoughts.popleft()
+
+    def record(self, crab: str | None, route: str, usage: dict):
+        now = time.time()
+        with self._lock:
+            self._calls.append((now, crab, route, usage))
+            self._prune(now)
+
+    def note_thought(self, crab: str | None):
+        now = time.time()
+        with self._lock:
+            self._thoughts.append((now, crab))
+            self._prune(now)
+
+    def summary(self, crab: str | None = None, window: float = 300) -> dict:
+        """Per-route totals and rates for one crab (or all) over the last `window` seconds."""
+        since = time.time() - window
+        with self._lock:
+            calls = [(r, u) for ts, c, r, u in self._calls
+                     if ts >= since and (crab is None or c == crab)]
+            thoughts = sum(1 for ts, c in self._thoughts
+                           if ts >= since and (crab is None or c == crab))
+
+        routes: dict[str, dict] = {}
+        for route, usage in calls:
+            agg = routes.setdefault(route, {"calls": 0, **{f: 0 for f in USAGE_FIELDS}})
+            agg["calls"] += 1
+            for f in USAGE_FIELDS:
+                agg[f] += usage.get(f) or 0
+
+        total_prompt = sum(a["prompt_eval_count"] for a in routes.values())
+        total_eval = sum(a["eval_count"] for a in routes.values())
+        for agg in routes.values():
+            agg.update(_rates(agg))
+        return {
+            "window_seconds": window,
+            "thoughts": thoughts,
+            "prompt_tokens": total_prompt,
+            "eval_tokens": total_eval,
+            "prompt_share": round(total_prompt / (total_prompt + total_eval), 3)
+                            if total_prompt + total_eval else None,
+            "tokens_per_thought": round((total_prompt + total_eval) / thoughts, 1)
+                                  if thoughts else None,
+            "routes": routes,
+        }
+
+
+def _rates(agg: dict) -> dict:
+    """Throughput derived from summed counts and nanosecond durations."""
+    def per_sec(count, ns):
+        return round(count / (ns / 1e9), 1) if ns else None
+
+    tokens = agg["prompt_eval_count"] + agg["eval_count"]
+    return {
+        "eval_tokens_per_sec": per_sec(agg["eval_count"], agg["eval_duration"]),
+        "prompt_tokens_per_sec": per_sec(agg["prompt_eval_count"], agg["prompt_eval_duration"]),
+        "prompt_share": round(agg["prompt_eval_count"] / tokens, 3) if tokens else None,
+    }
@@ -8,9 +8,33 @@ import shlex
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hermitclaw.chunkindex import search_files
+from hermitclaw.cmdmemo import memo
+from hermitclaw.config import config
+from hermitclaw.pyworkers import WorkerPool
+from hermitclaw.runner import runner
+from hermitclaw.stats import LatencyStats
+from hermitclaw.websearch import web_search
+from hermitclaw import venvs
 
 logger = logging.getLogger("hermitclaw.tools")
 
+# Bounded pool for shell commands and web searches, shared by all crabs
+tool_executor = ThreadPoolExecutor(
+    max_workers=config.get("tool_workers", 8), thread_name_prefix="hermitclaw-tool"
+)
+
+# Per-tool latency (execute_tool only — move/respond are handled by the brain)
+tool_stats: dict[str, LatencyStats] = {}
+
+# Commands that only read the box. Pipelines of these are safe to run side by side.
+READ_ONLY_COMMANDS = {"ls", "cat", "head", "tail", "grep", "find", "wc", "pwd", "stat", "du", "tree"}
+_FIND_WRITES = {"-exec", "-execdir", "-ok", "-okdir", "-delete", "-fprint", "-fprint0", "-fprintf", "-fls"}
+
 # Commands that should never be run (checked as prefixes after stripping)
 BLOCKED_PREFIXES = [
     "sudo", "su ", "rm -rf /", "chmod", "chown", "kill", "pkill",
@@ -25,6 +49,16 @@ BLOCKED_PREFIXES = [
 # Path to the Python sandbox wrapper
 _SANDBOX = os.path.join(os.path.dirname(__file__), "pysandbox.py")
 
+COMMAND_TIMEOUT = config["commands"]["timeout_seconds"]  # long enough for pip installs
+CAPTURE_BYTES = config["commands"]["capture_kb"] * 1024  # per stream; the model sees 3000 chars
+
+# Warm sandboxed interpreters per box (see pyworkers.py)
+_worker_pools: dict[str, WorkerPool] = {}
+_worker_pools_lock = threading.Lock()
+
+# Characters that mean a python command needs a real shell (pipes, redirects, globs, ...)
+_SHELL_SPECIAL = set("|&;<>()$`*?[]{}~\\\n#")
+
 
 def _venv_dir(env_root: str) -> str:
     """Path to the crab's virtual environment."""
@@ -43,24 +77,8 @@ def _venv_bin(env_root: str) -> str:
 
 
 def ensure_venv(env_root: str):
-    """Create the crab's venv if it doesn't exist. Called once on startup."""
-    venv = _venv_dir(env_root)
-    if os.path.isfile(_venv_python(env_root)):
-        return
-    logger.info(f"Creating crab venv at {venv}...")
-    uv = shutil.which("uv")
-    if uv:
-        subprocess.run([uv, "venv", venv, "--python", sys.executable, "--seed"],
-                       capture_output=True, timeout=30)
-    else:
-        subprocess.run([sys.executable, "-m", "venv", venv],
-                       capture_output=True, timeout=30)
-    # Ensure pip is available (uv venvs and some system Pythons skip it)
-    vpython = _venv_python(env_root)
-    if os.path.isfile(vpython):
-        subprocess.run([vpython, "-m", "ensurepip", "--upgrade"],
-                       capture_output=True, timeout=30)
-    logger.info("Crab venv created.")
+    """Create the crab's venv if it doesn't exist (a clone of the template). Called once on startup."""
+    venvs.ensure_venv(_venv_dir(env_root), sys.executable)
 
 
 def _is_safe_command(command: str) -> str | None:
@@ -105,6 +123,31 @@ def _is_safe_command(command: str) -> str | None:
     return None
 
 
+def _tree_writes(word: str) -> bool:
+    """`tree -o FILE` / `--output=FILE` writes its listing to a file."""
+    if word.startswith("--"):
+        return word.startswith("--output")
+    return word.startswith("-") and "o" in word[1:]
+
+
+def is_read_only(command: str) -> bool:
+    """Conservative check that a shell command has no side effects.
+
+    Any redirection, chaining or substitution makes it "not read-only".
+    """
+    if not command.strip() or any(ch in command for ch in "><;&`$\n"):
+        return False
+    for part in command.split("|"):
+        words = part.split()
+        if not words or words[0] not in READ_ONLY_COMMANDS:
+            return False
+        if words[0] == "find" and _FIND_WRITES.intersection(words):
+            return False
+        if words[0] == "tree" and any(_tree_writes(w) for w in words[1:]):
+            return False
+    return True
+
+
 def _rewrite_python_cmd(command: str, env_root: str) -> str | None:
     """If command is a python invocation, rewrite to run through the sandbox.
 
@@ -123,29 +166,124 @@ def _rewrite_python_cmd(command: str, env_root: str) -> str | None:
     return f"{shlex.quote(python)} {shlex.quote(_SANDBOX)} {shlex.quote(real_root)}{rest}"
 
 
+def _python_job(command: str) -> list[str] | None:
+    """pysandbox args for a plain `python -c ...` / `python script.py ...` command.
+
+    None if the shell would do anything to it (pipes, redirects, globs,
+    variables) or it uses interpreter flags — those take the normal path.
+    """
+    quote = None
+    for ch in command:
+        if quote:
+            if ch == quote:
+                quote = None
+            elif quote == '"' and ch in "$`\\":
+                return None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in _SHELL_SPECIAL:
+            return None
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        return None
+    if len(words) < 2 or words[0] not in ("python", "python3"):
+        return None
+    args = words[1:]
+    if args[0].startswith("-") and args[0] != "-c":
+        return None
+    return args
+
+
+def _python_workers(env_root: str) -> WorkerPool | None:
+    """The box's warm worker pool (None when disabled)."""
+    cfg = config["python_workers"]
+    if not cfg["enabled"]:
+        return None
+    real_root = os.path.realpath(env_root)
+    python = _venv_python(env_root) if os.path.isfile(_venv_python(env_root)) else sys.executable
+    with _worker_pools_lock:
+        pool = _worker_pools.get(real_root)
+        if pool is not None and pool.python != python:
+            pool.close()  # the venv appeared after the pool started
+            pool = None
+        if pool is None:
+            pool = _worker_pools[real_root] = WorkerPool(
+                python, _SANDBOX, real_root, _command_env(env_root),
+                size=cfg["per_box"], preload=cfg["preload"],
+            )
+        return pool
+
+
+def worker_status() -> dict:
+    with _worker_pools_lock:
+        return {root: pool.status() for root, pool in _worker_pools.items()}
+
+
 def _rewrite_pip_cmd(command: str, env_root: str) -> str | None:
-    """If command is pip/uv pip, rewrite to use the venv. Returns rewritten cmd or None."""
+    """If command is pip/uv pip, rewrite to use the venv. Returns rewritten cmd or None.
+
+    Downloads and built wheels go to the shared pip cache, so a package one
+    crab installed installs from disk for the next.
+    """
     stripped = command.strip()
+    cache_dir = config["venv"]["pip_cache_dir"]
+    cache = f" --cache-dir {shlex.quote(cache_dir)}" if cache_dir else ""
     if stripped.startswith("uv pip "):
         # Route through venv python
         rest = stripped[7:]  # after "uv pip "
         uv = shutil.which("uv") or "uv"
-        return f"{shlex.quote(uv)} pip {rest} --python {shlex.quote(_venv_python(env_root))}"
+        return f"{shlex.quote(uv)} pip {rest} --python {shlex.quote(_venv_python(env_root))}{cache}"
     if stripped.startswith("pip install") or stripped.startswith("pip3 install"):
         # Use venv pip
-        return f"{shlex.quote(_venv_python(env_root))} -m pip {stripped[stripped.index('install'):]}"
+        return f"{shlex.quote(_venv_python(env_root))} -m pip install{cache} {stripped[stripped.index('install') + 7:].lstrip()}"
     return None
 
 
-def run_command(command: str, env_root: str) -> str:
-    """Run a shell command sandboxed to the environment/ folder."""
+def run_command(command: str, env_root: str, usage: dict | None = None,
+                on_output=None) -> str:
+    """Run a shell command sandboxed to the environment/ folder.
+
+    Commands queue for a slot in the shared runner (fair across boxes, resource
+    limited). If `usage` is given, it's filled in with what the command used;
+    `on_output(stream, text)` is called with output as the command produces it.
+    """
     real_root = os.path.realpath(env_root)
+    usage = {} if usage is None else usage
 
     # Safety check (runs on original command before any rewriting)
     err = _is_safe_command(command)
     if err:
         return err
 
+    installs = "pip" in command  # python -m pip, pip3, uv pip, ...
+
+    # Read-only commands over files that haven't changed since last time: reuse the output
+    memo_token = None
+    if is_read_only(command):
+        memoized, memo_token = memo.lookup(real_root, command)
+        if memoized is not None:
+            usage["memoized"] = True
+            return memoized
+
+    # Plain python commands go to an already-sandboxed warm interpreter
+    job = _python_job(command)
+    workers = _python_workers(env_root) if job else None
+    if workers:
+        try:
+            with runner.slot(real_root) as queued:
+                started = time.monotonic()
+                stdout, stderr, job_usage = workers.run(job, COMMAND_TIMEOUT, CAPTURE_BYTES,
+                                                        on_output)
+            usage.update(job_usage or {}, queued_ms=round(queued * 1000, 1),
+                         wall_ms=round((time.monotonic() - started) * 1000, 1), warm=True)
+            return _format_output(stdout, stderr, usage.get("truncated"))
+        except subprocess.TimeoutExpired:
+            usage["timed_out"] = True
+            return f"Error: command timed out ({COMMAND_TIMEOUT}s limit)"
+        except Exception as e:
+            return f"Error: {e}"
+
     # Route python commands through the sandbox wrapper
     rewritten = _rewrite_python_cmd(command, env_root)
     if rewritten is not None:
@@ -156,82 +294,79 @@ def run_command(command: str, env_root: str) -> str:
     if pip_rewritten is not None:
         command = pip_rewritten
 
-    # Include venv bin in PATH so installed tools are available
-    vbin = _venv_bin(env_root)
-    venv_path = f"{vbin}:/usr/bin:/bin" if os.path.isdir(vbin) else "/usr/bin:/bin"
-
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            cwd=real_root,
-            capture_output=True,
-            text=True,
-            timeout=60,  # longer timeout for pip installs
-            env={
-                "HOME": real_root,
-                "PATH": venv_path,
-                "TMPDIR": real_root,
-                "LANG": "en_US.UTF-8",
-                "VIRTUAL_ENV": _venv_dir(env_root),
-            },
-        )
-
-        output = ""
-        if result.stdout:
-            output += result.stdout
-        if result.stderr:
-            output += result.stderr
-
-        if not output.strip():
-            output = "(no output)"
-
-        # Truncate very long output
-        if len(output) > 3000:
-            output = output[:3000] + "\n...(truncated)"
-
+        result = runner.run(command, real_root, cwd=real_root, env=_command_env(env_root),
+                            timeout=COMMAND_TIMEOUT, capture_bytes=CAPTURE_BYTES,
+                            on_output=on_output)
+        usage.update(result["usage"], returncode=result["returncode"])
+        output = _format_output(result["stdout"], result["stderr"], result["usage"]["truncated"])
+        if memo_token and not result["usage"]["truncated"]:
+            memo.store(real_root, memo_token, output)
         return output
 
     except subprocess.TimeoutExpired:
-        return "Error: command timed out (60s limit)"
+        usage["timed_out"] = True
+        return f"Error: command timed out ({COMMAND_TIMEOUT}s limit)"
     except Exception as e:
         return f"Error: {e}"
+    finally:
+        if installs:
+            # Warm workers may have imported the old version of what was just installed
+            pool = _worker_pools.get(real_root)
+            if pool:
+                pool.reset()
 
 
-def web_search(query: str, max_results: int = 5) -> str:
-    """Search the web via DuckDuckGo. Returns formatted results."""
-    try:
-        from ddgs import DDGS
-    except ImportError:
-        try:
-            from duckduckgo_search import DDGS
-        except ImportError:
-            return "Error: ddgs not installed. Run: pip install ddgs"
-
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-    except Exception as e:
-        return f"Search failed: {e}"
-
-    if not results:
-        return f"No results found for: {query}"
-
-    lines = []
-    for i, r in enumerate(results, 1):
-        title = r.get("title", "")
-        body = r.get("body", "")
-        url = r.get("href", "")
-        lines.append(f"{i}. {title}\n   {body}\n   {url}")
-
-    return "\n\n".join(lines)
-
-
-def execute_tool(name: str, arguments: dict, env_root: str) -> str:
-    """Run a tool by name."""
+def _command_env(env_root: str) -> dict:
+    """Environment for commands run in the box."""
+    real_root = os.path.realpath(env_root)
+    # Include venv bin in PATH so installed tools are available
+    vbin = _venv_bin(env_root)
+    venv_path = f"{vbin}:/usr/bin:/bin" if os.path.isdir(vbin) else "/usr/bin:/bin"
+    return {
+        "HOME": real_root,
+        "PATH": venv_path,
+        "TMPDIR": real_root,
+        "LANG": "en_US.UTF-8",
+        "VIRTUAL_ENV": _venv_dir(env_root),
+        "PYTHONUNBUFFERED": "1",  # so output streams while scripts run
+    }
+
+
+def _format_output(stdout: str, stderr: str, stopped: bool = False) -> str:
+    output = ""
+    if stdout:
+        output += stdout
+    if stderr:
+        output += stderr
+
+    if not output.strip():
+        output = "(no output)"
+
+    # Truncate very long output
+    if len(output) > 3000:
+        output = output[:3000] + "\n...(truncated)"
+
+    if stopped:
+        output += (f"\n(stopped: the command printed more than {CAPTURE_BYTES // 1024} KB of output; "
+                   "redirect it to a file to let it run to the end)")
+
+    return output
+
+
+def execute_tool(name: str, arguments: dict, env_root: str, usage: dict | None = None,
+                 on_output=None) -> str:
+    """Run a tool by name. Shell commands fill in `usage` and stream to `on_output`
+    (see run_command)."""
+    started = time.monotonic()
     if name == "shell":
-        return run_command(arguments["command"], env_root)
+        result = run_command(arguments["command"], env_root, usage, on_output)
     elif name == "web_search":
-        return web_search(arguments.get("query", ""), arguments.get("max_results", 5))
+        result = web_search(arguments.get("query", ""), arguments.get("max_results", 5),
+                            crab=env_root)
+    elif name == "search_files":
+        result = search_files(arguments.get("query", ""), env_root, arguments.get("max_results", 5))
     else:
         return f"Unknown tool: {name}"
+    tool_stats.setdefault(name, LatencyStats()).record(time.monotonic() - started)
+    return result
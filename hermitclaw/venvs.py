@@ -0,0 +1,197 @@
+"""Template venvs — new boxes get a copy of a prebuilt venv instead of building their own."""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+from hermitclaw.config import config
+from hermitclaw.stats import LatencyStats
+
+logger = logging.getLogger("hermitclaw.venvs")
+
+MARKER = "hermitclaw-template.json"  # in each template: where it was built, files to fix up
+_FICLONE = 0x40049409  # linux/fs.h: share a file's extents (copy-on-write), if the filesystem can
+
+# Time to give a box its venv, by how it was made
+create_stats = {"cloned": LatencyStats(), "built": LatencyStats()}
+_build_lock = threading.Lock()  # one template build per process (flock covers other processes)
+
+
+def build_venv(venv: str, python: str):
+    """Build a venv from scratch with pip in it (uv if it's installed)."""
+    uv = shutil.which("uv")
+    if uv:
+        subprocess.run([uv, "venv", venv, "--python", python, "--seed"],
+                       capture_output=True, timeout=30)
+    else:
+        subprocess.run([python, "-m", "venv", venv],
+                       capture_output=True, timeout=30)
+    # Ensure pip is available (uv venvs and some system Pythons skip it)
+    vpython = os.path.join(venv, "bin", "python")
+    if os.path.isfile(vpython):
+        subprocess.run([vpython, "-m", "ensurepip", "--upgrade"],
+                       capture_output=True, timeout=30)
+
+
+def _template_key(python: str) -> str:
+    """Changes when the interpreter does (a different one, or upgraded in place)."""
+    real = os.path.realpath(python)
+    st = os.stat(real)
+    raw = f"{real}\0{st.st_size}\0{st.st_mtime_ns}"
+    return f"{os.path.basename(real)}-{hashlib.sha256(raw.encode()).hexdigest()[:12]}"
+
+
+def _files_mentioning(root: str, text: str) -> list[str]:
+    """Regular files under root that contain `text` (shebangs, activate scripts, pyvenv.cfg)."""
+    needle = text.encode()
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path):
+                continue
+            with open(path, "rb") as f:
+                if needle in f.read():
+                    found.append(os.path.relpath(path, root))
+    return found
+
+
+def template_for(python: str) -> str | None:
+    """The template venv for `python`, building it first if there isn't one. None if that fails."""
+    base = config["venv"]["template_dir"]
+    if not base:
+        return None
+    template = os.path.join(base, _template_key(python))
+    if os.path.isfile(os.path.join(template, MARKER)):
+        return template
+    os.makedirs(base, exist_ok=True)
+    # Several crabs (or servers) can start at once; only one of them builds
+    with _build_lock, open(template + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.isfile(os.path.join(template, MARKER)):
+            return template
+        building = f"{template}.tmp-{os.getpid()}"
+        shutil.rmtree(building, ignore_errors=True)
+        logger.info(f"Building template venv for {python} at {template}...")
+        started = time.monotonic()
+        build_venv(building, python)
+        if not os.path.isfile(os.path.join(building, "bin", "python")):
+            logger.error(f"Template venv build failed for {python}")
+            shutil.rmtree(building, ignore_errors=True)
+            return None
+        info = {
+            "python": python,
+            "built_at": building,
+            "fixups": _files_mentioning(building, building),
+            "build_seconds": round(time.monotonic() - started, 2),
+        }
+        with open(os.path.join(building, MARKER), "w") as f:
+            json.dump(info, f, indent=2)
+        shutil.rmtree(template, ignore_errors=True)
+        os.rename(building, template)
+        logger.info(f"Template venv ready in {info['build_seconds']}s")
+        return template
+
+
+class _Copier:
+    """Copies files for one clone, falling back from reflink to `mode` on the first refusal."""
+
+    def __init__(self, mode: str):
+        self.mode = mode  # "auto" (reflink, else copy), "hardlink" or "copy"
+        self.reflink = mode == "auto"
+
+    def __call__(self, src: str, dst: str):
+        if self.reflink:
+            try:
+                with open(src, "rb") as s, open(dst, "wb") as d:
+                    fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+                shutil.copystat(src, dst)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                    raise
+                self.reflink = False
+        if self.mode == "hardlink":
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                self.mode = "copy"  # different filesystem
+        shutil.copy2(src, dst)
+
+
+def clone_venv(template: str, venv: str):
+    """Copy a template venv to `venv`, pointing its scripts at the new location."""
+    with open(os.path.join(template, MARKER)) as f:
+        info = json.load(f)
+    old, new = info["built_at"].encode(), venv.encode()
+    fixups = set(info["fixups"])
+    copier = _Copier(config["venv"]["clone"])
+
+    def copy(src, dst):
+        rel = os.path.relpath(src, template)
+        if rel not in fixups:
+            return copier(src, dst)
+        with open(src, "rb") as f:
+            data = f.read().replace(old, new)
+        with open(dst, "wb") as f:
+            f.write(data)
+        shutil.copymode(src, dst)
+
+    # Staged then renamed, so a half-finished clone never looks like a venv
+    staging = venv + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(template, staging, symlinks=True, copy_function=copy,
+                    ignore=lambda d, names: [MARKER] if d == template else [])
+    os.rename(staging, venv)
+
+
+def ensure_venv(venv: str, python: str):
+    """Give a box its venv: a clone of the interpreter's template, or a fresh build if that fails."""
+    if os.path.isfile(os.path.join(venv, "bin", "python")):
+        return
+    started = time.monotonic()
+    try:
+        template = template_for(python)
+        if template:
+            clone_venv(template, venv)
+            create_stats["cloned"].record(time.monotonic() - started)
+            logger.info(f"Cloned template venv to {venv} in {time.monotonic() - started:.2f}s")
+            return
+    except Exception as e:
+        logger.error(f"Template venv clone failed, building instead: {e}")
+        shutil.rmtree(venv + ".tmp", ignore_errors=True)
+    logger.info(f"Creating crab venv at {venv}...")
+    build_venv(venv, python)
+    create_stats["built"].record(time.monotonic() - started)
+    logger.info("Crab venv created.")
+
+
+def status() -> dict:
+    cfg = config["venv"]
+    base = cfg["template_dir"]
+    templates = {}
+    if base and os.path.isdir(base):
+        for name in sorted(os.listdir(base)):
+            try:
+                with open(os.path.join(base, name, MARKER)) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            templates[name] = {"python": info["python"], "build_seconds": info["build_seconds"]}
+    return {
+        "templates": templates,
+        "clone": cfg["clone"],
+        "pip_cache_dir": cfg["pip_cache_dir"],
+        "created": {kind: stats.summary() for kind, stats in create_stats.items()},
+    }
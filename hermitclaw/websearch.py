@@ -0,0 +1,147 @@
+"""Web search — a pluggable backend behind a persistent, shared result cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from hermitclaw.cache import DiskCache
+from hermitclaw.config import config
+
+logger = logging.getLogger("hermitclaw.websearch")
+
+_WORD = re.compile(r"\w+")
+_OPERATORS = {"OR", "AND", "NOT"}  # only mean something in capitals
+
+
+def normalize_query(query: str) -> str:
+    """Case, spacing and a trailing ?/. don't change what a search engine returns.
+
+    Everything else can: symbols ("c++", "c#"), exclusions ("-snake"),
+    "quoted phrases" and site: stay in the key.
+    """
+    words = query.strip().rstrip("?.").split()
+    return " ".join(w if w in _OPERATORS else w.casefold() for w in words)
+
+
+class DDGSBackend:
+    """DuckDuckGo via ddgs (or the older duckduckgo_search). One client per thread."""
+
+    name = "ddgs"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            try:
+                from ddgs import DDGS
+            except ImportError:
+                from duckduckgo_search import DDGS  # ImportError here means neither is installed
+            client = self._local.client = DDGS()
+        return client
+
+    def search(self, query: str, max_results: int) -> list[dict]:
+        """[{"title", "body", "href"}]. Raises on failure."""
+        return list(self._client().text(query, max_results=max_results))
+
+
+class FixtureBackend:
+    """Offline search over a fixed set of documents — for tests, benchmarks and air-gapped boxes.
+
+    Documents are {"title", "body", "href"}, from a JSON list or a JSONL file.
+    Results are the documents sharing the most words with the query, ties in
+    file order, so the same query always gets the same answer.
+    """
+
+    name = "fixture"
+
+    def __init__(self, docs: list[dict] | None = None, path: str | None = None):
+        if docs is None:
+            docs = []
+            if path:
+                with open(path) as f:
+                    text = f.read()
+                if text.lstrip().startswith("["):
+                    docs = json.loads(text)
+                else:
+                    docs = [json.loads(line) for line in text.splitlines() if line.strip()]
+        self.docs = docs
+        self._words = [set(_WORD.findall(f"{d.get('title', '')} {d.get('body', '')}".casefold()))
+                       for d in docs]
+
+    def search(self, query: str, max_results: int) -> list[dict]:
+        words = set(_WORD.findall(query.casefold()))
+        scored = [(len(words & w), i) for i, w in enumerate(self._words) if words & w]
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [self.docs[i] for _, i in scored[:max_results]]
+
+
+def backend_from_config(cfg: dict):
+    if cfg["backend"] == "fixture":
+        return FixtureBackend(path=cfg["fixture_path"])
+    return DDGSBackend()
+
+
+_cfg = config["web_search"]
+
+# Swappable at runtime (the mock bench puts a FixtureBackend here)
+backend = backend_from_config(_cfg)
+
+_cache = DiskCache(_cfg["cache_path"], ttl=_cfg["ttl_seconds"], max_entries=_cfg["max_entries"]) \
+    if _cfg["cache_path"] else None
+
+
+def _cache_key(query: str, crab: str | None) -> str:
+    scope = "" if _cfg["shared"] else os.path.realpath(crab or "")
+    raw = f"{backend.name}\0{scope}\0{normalize_query(query)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def search(query: str, max_results: int = 5, crab: str | None = None) -> list[dict]:
+    """Search results, from the cache while they're fresh. Raises if the backend fails.
+
+    An entry fetched with a larger max_results also answers smaller ones.
+    Empty results aren't cached — they're as often a hiccup as a real answer.
+    """
+    key = _cache_key(query, crab) if _cache else None
+    if key:
+        cached = _cache.get(key)
+        if cached is not None and (cached["max_results"] >= max_results
+                                   or len(cached["results"]) < cached["max_results"]):
+            return cached["results"][:max_results]
+    results = [{"title": r.get("title", ""), "body": r.get("body", ""), "href": r.get("href", "")}
+               for r in backend.search(query, max_results)]
+    if key and results:
+        _cache.put(key, {"max_results": max_results, "results": results})
+    return results
+
+
+def web_search(query: str, max_results: int = 5, crab: str | None = None) -> str:
+    """The web_search tool. Returns formatted results. `crab` scopes the cache when it isn't shared."""
+    if not query.strip():
+        return "Error: empty query"
+    try:
+        results = search(query, max(1, min(int(max_results or 5), 20)), crab)
+    except ImportError:
+        return "Error: ddgs not installed. Run: pip install ddgs"
+    except Exception as e:
+        return f"Search failed: {e}"
+
+    if not results:
+        return f"No results found for: {query}"
+
+    lines = []
+    for i, r in enumerate(results, 1):
+        lines.append(f"{i}. {r['title']}\n   {r['body']}\n   {r['href']}")
+
+    return "\n\n".join(lines)
+
+
+def cache_stats() -> dict | None:
+    return _cache.stats() if _cache else None
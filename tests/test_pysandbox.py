@@ -0,0 +1,147 @@
+"""Adversarial path checks for the Python sandbox.
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from hermitclaw.pysandbox import _check_path
+
+
+class CheckPathTest(unittest.TestCase):
+    """Every decision must match resolving the path in full (realpath, then a prefix check)."""
+
+    def setUp(self):
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        self.root = os.path.join(self.tmp, "box")
+        self.out = os.path.join(self.tmp, "outside")
+        for d in ("box/sub/deep", "box/sub2", "outside/sub", "box-sibling"):
+            os.makedirs(os.path.join(self.tmp, d))
+        for f in ("box/file.txt", "box/sub/deep/note.txt", "outside/secret", "box-sibling/x"):
+            Path(self.tmp, f).write_text("x")
+        self.link("box/link_out", self.out)
+        self.link("box/file_link_out", os.path.join(self.out, "secret"))
+        self.link("box/link_in", "sub")
+        self.link("box/dangling", "/nonexistent/x")
+        self.link("box/chain1", "chain2")
+        self.link("box/chain2", self.out)
+        self.link("box/sub/up", "..")
+        self.link("box/sub/upup", "../..")
+
+    def link(self, rel, target):
+        os.symlink(target, os.path.join(self.tmp, rel))
+
+    def allowed(self, path):
+        try:
+            _check_path(path, self.root)
+            return True
+        except PermissionError:
+            return False
+
+    def expected(self, path):
+        path = os.fsdecode(path)
+        full = os.path.realpath(os.path.join(os.getcwd(), path))
+        return full == self.root or full.startswith(self.root + os.sep)
+
+    def assertDecision(self, path, allowed):
+        self.assertEqual(self.expected(path), allowed, f"reference disagrees on {path!r}")
+        self.assertEqual(self.allowed(path), allowed, path)
+
+    def box(self, rel=""):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def test_inside(self):
+        for rel in ("", "file.txt", "sub", "sub/deep/note.txt", "sub/new.txt", "new/dir/f",
+                    "link_in/deep/note.txt", "sub/up/file.txt", "sub/./deep//note.txt"):
+            self.assertDecision(self.box(rel), True)
+
+    def test_dotdot(self):
+        for rel in ("../outside/secret", "sub/../../outside/secret", "sub/deep/../../..",
+                    "../box-sibling/x", "link_in/../../outside"):
+            self.assertDecision(self.box(rel), False)
+        for rel in ("sub/../file.txt", "sub/deep/../../sub2", "sub/upup/box/file.txt"):
+            self.assertDecision(self.box(rel), True)
+
+    def test_absolute_outside(self):
+        for path in (os.path.join(self.out, "secret"), self.tmp, "/etc/passwd", "/",
+                     self.root + "-sibling/x", os.path.join(self.tmp, "box-sibling")):
+            self.assertDecision(path, False)
+
+    def test_symlinks_out(self):
+        for rel in ("link_out", "link_out/secret", "link_out/sub", "link_out/new",
+                    "file_link_out", "chain1", "chain1/secret", "dangling", "sub/upup",
+                    "sub/upup/outside/secret"):
+            self.assertDecision(self.box(rel), False)
+
+    def test_proc(self):
+        self.assertDecision(f"/proc/self/root{self.out}/secret", False)
+        self.assertDecision(f"/proc/self/root{self.root}/file.txt", True)
+        os.chdir(self.out)
+        self.assertDecision("/proc/self/cwd/secret", False)
+
+    def test_bytes_and_pathlike(self):
+        self.assertDecision(os.fsencode(self.box("file.txt")), True)
+        self.assertDecision(Path(self.box("sub/deep/note.txt")), True)
+        self.assertDecision(os.fsencode(os.path.join(self.out, "secret")), False)
+        self.assertDecision(Path(self.box("link_out/secret")), False)
+
+    def test_relative_from_cwd(self):
+        os.chdir(self.box("sub"))
+        self.assertDecision("deep/note.txt", True)
+        self.assertDecision("../file.txt", True)
+        self.assertDecision("../../outside/secret", False)
+        os.chdir(self.out)
+        self.assertDecision("secret", False)
+        self.assertDecision("sub", False)
+
+    def test_symlink_swapped_in_after_check(self):
+        self.assertDecision(self.box("sub/deep/note.txt"), True)
+        os.rename(self.box("sub"), self.box("sub.old"))
+        os.symlink(self.out, self.box("sub"))
+        self.assertDecision(self.box("sub/secret"), False)
+        self.assertDecision(self.box("sub/deep/note.txt"), False)
+        os.remove(self.box("sub"))
+        os.rename(self.box("sub.old"), self.box("sub"))
+        self.assertDecision(self.box("sub/deep/note.txt"), True)
+
+    def test_file_swapped_for_symlink(self):
+        self.assertDecision(self.box("file.txt"), True)
+        os.remove(self.box("file.txt"))
+        os.symlink(os.path.join(self.out, "secret"), self.box("file.txt"))
+        self.assertDecision(self.box("file.txt"), False)
+
+    def test_directory_moved_out(self):
+        # Same inode at the same path (through a symlink), but no longer in the box
+        self.assertDecision(self.box("sub/deep/note.txt"), True)
+        os.rename(self.box("sub"), os.path.join(self.out, "moved"))
+        os.symlink(os.path.join(self.out, "moved"), self.box("sub"))
+        self.assertDecision(self.box("sub/deep/note.txt"), False)
+        self.assertDecision(self.box("sub/deep"), False)
+
+    def test_directory_moved_in(self):
+        self.assertDecision(os.path.join(self.out, "sub"), False)
+        os.rename(os.path.join(self.out, "sub"), self.box("moved"))
+        self.assertDecision(self.box("moved"), True)
+        self.assertDecision(self.box("moved/f"), True)
+
+    def test_box_renamed(self):
+        self.assertDecision(self.box("file.txt"), True)
+        os.rename(self.root, self.root + ".old")
+        os.symlink(self.out, self.root)
+        self.assertDecision(self.box("secret"), False)
+        self.assertDecision(self.box("sub"), False)
+
+    def test_file_used_as_directory(self):
+        self.assertDecision(self.box("file.txt/x"), True)
+        self.assertDecision(self.box("file_link_out/x"), False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -125,6 +125,13 @@ class TarnWatch:
                         self.add_log(f"    {line}", "dim")
                     if len(lines) > 8:
                         self.add_log(f"    ...({len(lines) - 8} more lines)", "dim")
+            elif t == "command_usage" and e.get("memoized"):
+                self.add_log("    (unchanged files — output reused)", "dim")
+            elif t == "command_usage":
+                cpu = e.get("cpu_user_s", 0) + e.get("cpu_sys_s", 0)
+                queued = f", queued {e['queued_ms']:.0f} ms" if e.get("queued_ms", 0) >= 100 else ""
+                self.add_log(f"    ({e.get('wall_ms', 0):.0f} ms, {cpu:.2f}s cpu, "
+                             f"{e.get('max_rss_mb', 0):.0f} MB{queued})", "dim")
             elif t == "reflection":
                 self.add_log("")
                 self.add_log(f"  reflection: {e.get('text', '')}", "reflection")